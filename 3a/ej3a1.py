@@ -15,10 +15,30 @@ Este ejercicio se enfoca en las operaciones básicas de SQL desde Python sin uti
 
 import sqlite3
 import os
+import sys
 
 # Ruta de la base de datos (en memoria para este ejemplo)
 # Para una base de datos en archivo, usar: 'biblioteca.db'
 DB_PATH = ':memory:'
+# Número de sentencias preparadas que cada conexión mantiene en caché
+CACHED_STATEMENTS = 256
+
+# Sentencias SQL reutilizadas. Al ejecutar siempre el mismo texto, sqlite3 las
+# encuentra en su caché de sentencias preparadas y no vuelve a compilarlas
+_SQL_INSERTAR_AUTOR = "INSERT INTO autores (nombre) VALUES (?)"
+_SQL_INSERTAR_LIBRO = "INSERT INTO libros (titulo, anio, autor_id) VALUES (?, ?, ?)"
+_SQL_CONSULTAR_LIBROS = """
+    SELECT  libros.titulo, libros.anio, autores.nombre
+    FROM autores
+    JOIN libros ON autores.id = libros.autor_id
+    """
+_SQL_BUSCAR_LIBROS_POR_AUTOR = """
+    SELECT libros.titulo, libros.anio
+    FROM autores
+    INNER JOIN libros ON autores.id = libros.autor_id
+    WHERE autores.nombre = ?
+    """
+_SQL_ELIMINAR_LIBRO = "DELETE FROM libros WHERE libros.id = ?"
 
 def crear_conexion():
     """
@@ -27,7 +47,16 @@ def crear_conexion():
     # Implementa la creación de la conexión y retorna el objeto conexión
 
     # Conectamos a la base de datos en memoria
-    conexion = sqlite3.connect(DB_PATH)
+    conexion = sqlite3.connect(DB_PATH, cached_statements=CACHED_STATEMENTS)
+    # Ajustamos el rendimiento de la conexión. En memoria el modo WAL no tiene
+    # efecto, así que solo se activa cuando la base de datos está en un archivo
+    if DB_PATH != ':memory:':
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA mmap_size=268435456")
+        conexion.execute("PRAGMA journal_size_limit=6144000")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    conexion.execute("PRAGMA temp_store=MEMORY")
+    conexion.execute("PRAGMA cache_size=-8000")
     return conexion
 
 def crear_tablas(conexion):
@@ -44,9 +73,11 @@ def crear_tablas(conexion):
     cursor = conexion.cursor()
     # Sentencia SQL para crear la tabla 'autores'
     # Se usa IF NOT EXISTS para evitar un error si la tabla ya existe
+    # INTEGER PRIMARY KEY ya asigna los id automáticamente; no se usa AUTOINCREMENT
+    # porque obliga a actualizar la tabla sqlite_sequence en cada inserción
     crear_tabla_sql = """
     CREATE TABLE IF NOT EXISTS autores (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INTEGER PRIMARY KEY,
     nombre TEXT NOT NULL
     )
     """
@@ -56,7 +87,7 @@ def crear_tablas(conexion):
     # Creamos la tabla 'libros'
     crear_tabla_sql = """
     CREATE TABLE IF NOT EXISTS libros (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INTEGER PRIMARY KEY,
     titulo TEXT NOT NULL,
     anio INTEGER,
     autor_id INTEGER,
@@ -65,60 +96,59 @@ def crear_tablas(conexion):
     """
     # Ejecutamos la sentencia SQL
     cursor.execute(crear_tabla_sql)
+    # Creamos índices para la búsqueda por nombre de autor y para el JOIN
+    # entre libros y autores, evitando recorrer las tablas completas
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_libros_autor ON libros(autor_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_autores_nombre ON autores(nombre)")
     # Confirmamos y guardamos los cambios
     conexion.commit()
 
 def insertar_autores(conexion, autores):
     """
     Inserta varios autores en la tabla 'autores'
-    Parámetro autores: Lista de tuplas (nombre,)
+    Parámetro autores: Lista de tuplas (nombre,). Admite cualquier iterable, como un
+    generador, que executemany consume fila a fila sin cargarlo entero en memoria
+    No hace commit: quien llama decide cuándo confirmar la transacción
     """
     # Implementa la inserción de autores usando SQL INSERT
     # Usa consultas parametrizadas para mayor seguridad
     # Creamos un objeto cursor
     cursor = conexion.cursor()   
-    cursor.executemany('INSERT INTO autores (nombre) VALUES (?)', autores)
-    # Confirmamos y guardamos los cambios
-    conexion.commit()
+    cursor.executemany(_SQL_INSERTAR_AUTOR, autores)
 
 def insertar_libros(conexion, libros):
     """
     Inserta varios libros en la tabla 'libros'
-    Parámetro libros: Lista de tuplas (titulo, anio, autor_id)
+    Parámetro libros: Lista de tuplas (titulo, anio, autor_id). Admite cualquier
+    iterable, como un generador, que executemany consume fila a fila
+    No hace commit: quien llama decide cuándo confirmar la transacción
     """
     # Implementa la inserción de libros usando SQL INSERT
     # Usa consultas parametrizadas para mayor seguridad
     # Creamos un objeto cursor
     cursor = conexion.cursor()    
-    cursor.executemany('INSERT INTO libros (titulo, anio, autor_id) VALUES (?, ?, ?)', libros)
-    # Confirmamos y guardamos los cambios
-    conexion.commit()
+    cursor.executemany(_SQL_INSERTAR_LIBRO, libros)
 
-def consultar_libros(conexion):
+def consultar_libros(conexion, salida=None):
     """
     Consulta todos los libros y muestra título, año y nombre del autor
+    Parámetro salida: flujo donde se escriben los resultados (por defecto sys.stdout)
     """
     # Implementa una consulta SQL JOIN para obtener libros con sus autores
     # Imprime los resultados formateados
     # Creamos un objeto cursor
     cursor = conexion.cursor()
-    # Creamos la consulta JOIN
-    consultar_libros = ( """
-    SELECT  libros.titulo, libros.anio, autores.nombre
-    FROM autores
-    JOIN libros ON autores.id = libros.autor_id
-    """
-    )
-    # Ejecutamos la sentencia SQL
-    cursor.execute(consultar_libros)
+    # Ejecutamos la consulta JOIN
+    cursor.execute(_SQL_CONSULTAR_LIBROS)
     # Obtenemos todos los resultados
     resultados = cursor.fetchall()
-    # Imprimimos los resultados formateados 
+    # Imprimimos los resultados formateados con una sola escritura en lugar
+    # de un print (y una llamada al sistema) por fila
     if resultados:
-        for fila in resultados:
-            titulo, anio, autor = fila
-            print(f' Titulo: {titulo} | Año: {anio} | Autor: {autor}')
-    
+        lineas = [f' Titulo: {titulo} | Año: {anio} | Autor: {autor}'
+                  for titulo, anio, autor in resultados]
+        (salida if salida is not None else sys.stdout).write("\n".join(lineas) + "\n")
+
 def buscar_libros_por_autor(conexion, nombre_autor):
     """
     Busca libros por el nombre del autor
@@ -127,97 +157,88 @@ def buscar_libros_por_autor(conexion, nombre_autor):
     # Retorna una lista de tuplas (titulo, anio)
     # Creamos un objeto cursor
     cursor = conexion.cursor()
-    # Construimos la consulta INNER JOIN - WHERE
-    consulta = ( """
-    SELECT libros.titulo, libros.anio
-    FROM autores
-    INNER JOIN libros ON autores.id = libros.autor_id 
-    WHERE autores.nombre = ?
-    """
-    )
-    # Ejecutamos la consulta
-    cursor.execute(consulta, (nombre_autor,))
+    # Ejecutamos la consulta INNER JOIN - WHERE
+    cursor.execute(_SQL_BUSCAR_LIBROS_POR_AUTOR, (nombre_autor,))
 
     # Obtenemos todos los resultados
     resultados = cursor.fetchall()
-    # Devuelve los resultados 
-    if resultados:
-        return resultados
+    # Devuelve los resultados (una lista vacía si el autor no tiene libros)
+    return resultados
 
 def actualizar_libro(conexion, id_libro, nuevo_titulo=None, nuevo_anio=None):
     """
     Actualiza la información de un libro existente
+    No hace commit: quien llama decide cuándo confirmar la transacción
     """
     # Implementa la actualización usando SQL UPDATE
     # Solo actualiza los campos que no son None
     # Creamos un objeto cursor
     cursor = conexion.cursor()
-    # Construimos por partes la consulta UPDATE - WHERE
-    consulta = ("UPDATE libros SET ")
+    # Construimos por partes la consulta UPDATE - WHERE con parámetros (?),
+    # así SQLite reutiliza la sentencia preparada y los enteros no pasan por TEXT
     var_updates = []
+    valores = []
     # Añadimos las diferentes partes de la consulta 
     if nuevo_titulo is not None:
-        var_updates.append(f"titulo = '{nuevo_titulo}'")
+        var_updates.append("titulo = ?")
+        valores.append(nuevo_titulo)
     if nuevo_anio is not None:
-        var_updates.append(f"anio = '{nuevo_anio}'")
-    if var_updates:
-        consulta += ", ".join(var_updates)
-        consulta += f"WHERE libros.id = '{id_libro}'"
+        var_updates.append("anio = ?")
+        valores.append(nuevo_anio)
+    # Si no hay nada que actualizar no ejecutamos ninguna consulta
+    if not var_updates:
+        return
+    consulta = f"UPDATE libros SET {', '.join(var_updates)} WHERE id = ?"
     # Ejecutamos la consulta    
-    cursor.execute(consulta)
-    # Confirmamos y guardamos los cambios
-    conexion.commit()
+    cursor.execute(consulta, (*valores, id_libro))
 
 def eliminar_libro(conexion, id_libro):
     """
     Elimina un libro por su ID
+    No hace commit: quien llama decide cuándo confirmar la transacción
     """
     # Implementa la eliminación usando SQL DELETE
     # Creamos un objeto cursor
     cursor = conexion.cursor()
-    # Construimos la consulta DELETE - WHERE
-    consulta = ("DELETE FROM libros WHERE libros.id = ?")
-    # Ejecutamos la consulta    
-    cursor.execute(consulta, (id_libro,))
-    # Confirmamos y guardamos los cambios
-    conexion.commit()
+    # Ejecutamos la consulta DELETE - WHERE
+    cursor.execute(_SQL_ELIMINAR_LIBRO, (id_libro,))
 
-def ejemplo_transaccion(conexion):
+def ejemplo_transaccion(conexion, nombre_autor="J.R.R. Tolkien", libros=None):
     """
     Demuestra el uso de transacciones para operaciones agrupadas
+    Inserta un autor y sus libros (lista de tuplas (titulo, anio)) en una única transacción
     """
     # Implementa una transacción que:
-    # 1. Comience con conexion.execute("BEGIN TRANSACTION")
+    # 1. Comience una transacción
     # 2. Realice varias operaciones
-    # 3. Si todo está bien, confirma con conexion.commit()
-    # 4. En caso de error, revierte con conexion.rollback()
-    
+    # 3. Si todo está bien, confirma los cambios
+    # 4. En caso de error, revierte los cambios
+    if libros is None:
+        libros = [("El hobbit", 1937)]
+
     # Creamos un objeto cursor
     cursor = conexion.cursor()
     
     # Iniciamos las operaciones 
     try:
-        # Iniciamos una transacción para agrupar operaciones
-        conexion.execute('BEGIN TRANSACTION')
-        # Operaciones
-        cursor.execute("INSERT INTO autores (nombre) VALUES ('J.R.R. Tolkien')")
-        cursor.execute("INSERT INTO libros (titulo, anio, autor_id) VALUES ('El hobbit', 1937, 4)")
-        # Confirmamos la transacción
-        conexion.commit()
+        # 'with conexion' agrupa las operaciones en una transacción: hace commit
+        # al salir del bloque o rollback si se produce una excepción
+        with conexion:
+            cursor.execute(_SQL_INSERTAR_AUTOR, (nombre_autor,))
+            # Usamos el id generado para el autor en lugar de suponer cuál será
+            autor_id = cursor.lastrowid
+            cursor.executemany(_SQL_INSERTAR_LIBRO,
+                               [(titulo, anio, autor_id) for titulo, anio in libros])
     except sqlite3.Error as e:
-        # Revertimos las operaciones en caso de error
-        conexion.rollback()
         print(f"Error en la transacción: {e}")
 
     # Comprobamos el resultado de la transacción
     cursor.execute("SELECT autores.nombre FROM autores ")
     # Obtenemos los resultados
     resultados = cursor.fetchall()
-    # Imprimimos los resultados formateados 
-    if resultados:
-        for fila in resultados:
-            autor = fila
-            print(f'Autor: {autor}')
+    # Imprimimos los resultados formateados en una sola escritura
+    # (si no hay resultados no se escribe nada)
+    sys.stdout.write("".join(f'Autor: {fila}\n' for fila in resultados))
 
 if __name__ == "__main__":
     try:
@@ -227,46 +248,49 @@ if __name__ == "__main__":
         print("Creando tablas...")
         crear_tablas(conexion)
 
-        # Insertar autores
-        autores = [
-            ("Gabriel García Márquez",),
-            ("Isabel Allende",),
-            ("Jorge Luis Borges",)
-        ]
-        insertar_autores(conexion, autores)
-        print("Autores insertados correctamente")
+        # Agrupamos inserciones, actualización y borrado en una única transacción:
+        # 'with conexion' hace commit al salir del bloque (o rollback si hay un error)
+        with conexion:
+            # Insertar autores
+            autores = [
+                ("Gabriel García Márquez",),
+                ("Isabel Allende",),
+                ("Jorge Luis Borges",)
+            ]
+            insertar_autores(conexion, autores)
+            print("Autores insertados correctamente")
 
-        # Insertar libros
-        libros = [
-            ("Cien años de soledad", 1967, 1),
-            ("El amor en los tiempos del cólera", 1985, 1),
-            ("La casa de los espíritus", 1982, 2),
-            ("Paula", 1994, 2),
-            ("Ficciones", 1944, 3),
-            ("El Aleph", 1949, 3)
-        ]
-        insertar_libros(conexion, libros)
-        print("Libros insertados correctamente")
+            # Insertar libros
+            libros = [
+                ("Cien años de soledad", 1967, 1),
+                ("El amor en los tiempos del cólera", 1985, 1),
+                ("La casa de los espíritus", 1982, 2),
+                ("Paula", 1994, 2),
+                ("Ficciones", 1944, 3),
+                ("El Aleph", 1949, 3)
+            ]
+            insertar_libros(conexion, libros)
+            print("Libros insertados correctamente")
 
-        print("\n--- Lista de todos los libros con sus autores ---")
-        consultar_libros(conexion)
+            print("\n--- Lista de todos los libros con sus autores ---")
+            consultar_libros(conexion)
 
-        print("\n--- Búsqueda de libros por autor ---")
-        nombre_autor = "Gabriel García Márquez"
-        libros_autor = buscar_libros_por_autor(conexion, nombre_autor)
-        print(f"Libros de {nombre_autor}:")
-        for titulo, anio in libros_autor:
-            print(f"- {titulo} ({anio})")
+            print("\n--- Búsqueda de libros por autor ---")
+            nombre_autor = "Gabriel García Márquez"
+            libros_autor = buscar_libros_por_autor(conexion, nombre_autor)
+            print(f"Libros de {nombre_autor}:")
+            if libros_autor:
+                print("\n".join(f"- {titulo} ({anio})" for titulo, anio in libros_autor))
 
-        print("\n--- Actualización de un libro ---")
-        actualizar_libro(conexion, 1, nuevo_titulo="Cien años de soledad (Edición especial)")
-        print("Libro actualizado. Nueva información:")
-        consultar_libros(conexion)
+            print("\n--- Actualización de un libro ---")
+            actualizar_libro(conexion, 1, nuevo_titulo="Cien años de soledad (Edición especial)")
+            print("Libro actualizado. Nueva información:")
+            consultar_libros(conexion)
 
-        print("\n--- Eliminación de un libro ---")
-        eliminar_libro(conexion, 6)  # Elimina "El Aleph"
-        print("Libro eliminado. Lista actualizada:")
-        consultar_libros(conexion)
+            print("\n--- Eliminación de un libro ---")
+            eliminar_libro(conexion, 6)  # Elimina "El Aleph"
+            print("Libro eliminado. Lista actualizada:")
+            consultar_libros(conexion)
 
         print("\n--- Demostración de transacción ---")
         ejemplo_transaccion(conexion)
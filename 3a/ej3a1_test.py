@@ -6,6 +6,7 @@ trabajar con bases de datos SQLite.
 import pytest
 import sqlite3
 import os
+import io
 from ej3a1 import (crear_conexion, crear_tablas, insertar_autores, insertar_libros,
                   consultar_libros, buscar_libros_por_autor, actualizar_libro,
                   eliminar_libro, ejemplo_transaccion)
@@ -154,6 +155,15 @@ def test_consultar_libros(db_con_datos, capfd):
     assert "Ficciones" in salida
     assert "Jorge Luis Borges" in salida
 
+def test_consultar_libros_salida(db_con_datos):
+    """Prueba que consultar_libros escribe en el flujo indicado, una línea por libro"""
+    salida = io.StringIO()
+    consultar_libros(db_con_datos, salida)
+
+    lineas = salida.getvalue().splitlines()
+    assert len(lineas) == 6
+    assert any("Cien años de soledad" in linea and "Gabriel García Márquez" in linea for linea in lineas)
+
 def test_buscar_libros_por_autor(db_con_datos):
     """Prueba la función buscar_libros_por_autor"""
     # Buscar libros de Gabriel García Márquez
@@ -169,6 +179,12 @@ def test_buscar_libros_por_autor(db_con_datos):
     assert 1967 in anios
     assert 1985 in anios
 
+def test_buscar_libros_por_autor_sin_resultados(db_con_datos):
+    """Prueba que buscar_libros_por_autor devuelve una lista vacía si no hay coincidencias"""
+    libros = buscar_libros_por_autor(db_con_datos, "Autor inexistente")
+
+    assert libros == []
+
 def test_actualizar_libro(db_con_datos):
     """Prueba la función actualizar_libro"""
     # Actualizar el título del libro con ID 1
@@ -235,3 +251,45 @@ def test_ejemplo_transaccion(db_con_datos):
     # La implementación específica dependerá del estudiante,
     # pero comprobamos que al menos la función no genera errores
     assert True  # No errores = prueba pasa
+
+def test_ejemplo_transaccion_autor_id(db_con_datos):
+    """Prueba que ejemplo_transaccion asocia los libros al autor que inserta"""
+    ejemplo_transaccion(db_con_datos, "Julio Cortázar", [("Rayuela", 1963), ("Bestiario", 1951)])
+
+    cursor = db_con_datos.cursor()
+    cursor.execute("""
+        SELECT libros.titulo FROM libros
+        JOIN autores ON autores.id = libros.autor_id
+        WHERE autores.nombre = 'Julio Cortázar'
+        ORDER BY libros.anio
+    """)
+    titulos = [fila[0] for fila in cursor.fetchall()]
+
+    assert titulos == ["Bestiario", "Rayuela"]
+
+def test_crear_tablas_indices(conexion):
+    """Prueba que crear_tablas crea los índices de autor_id y nombre"""
+    crear_tablas(conexion)
+
+    cursor = conexion.cursor()
+    cursor.execute("PRAGMA index_list(libros);")
+    indices_libros = [indice[1] for indice in cursor.fetchall()]
+    cursor.execute("PRAGMA index_list(autores);")
+    indices_autores = [indice[1] for indice in cursor.fetchall()]
+
+    assert "idx_libros_autor" in indices_libros
+    assert "idx_autores_nombre" in indices_autores
+
+    # Se puede volver a llamar sin errores
+    crear_tablas(conexion)
+
+def test_insertar_libros_generador(db_con_tablas):
+    """Prueba que insertar_libros acepta un generador de tuplas"""
+    insertar_autores(db_con_tablas, (("Autor de prueba",) for _ in range(1)))
+
+    libros = ((f"Libro {i}", 2000 + i, 1) for i in range(100))
+    insertar_libros(db_con_tablas, libros)
+
+    cursor = db_con_tablas.cursor()
+    cursor.execute("SELECT COUNT(*), MIN(anio), MAX(anio) FROM libros;")
+    assert cursor.fetchone() == (100, 2000, 2099)
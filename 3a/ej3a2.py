@@ -14,12 +14,53 @@ Debes crear una base de datos a partir de este script y realizar operaciones sob
 
 import sqlite3
 import os
-from typing import List, Tuple, Dict, Any, Optional
+import queue
+import threading
+from contextlib import contextmanager
+from typing import List, Tuple, Dict, Any, Optional, Iterator
 
 # Ruta al archivo SQL
 SQL_FILE_PATH = os.path.join(os.path.dirname(__file__), 'test.sql')
 # Ruta para la base de datos SQLite
 DB_PATH = os.path.join(os.path.dirname(__file__), 'biblioteca.db')
+# Número de sentencias preparadas que cada conexión mantiene en caché
+CACHED_STATEMENTS = 256
+
+# Sentencias SQL reutilizadas, para que sqlite3 las encuentre siempre en su
+# caché de sentencias preparadas
+_SQL_OBTENER_LIBROS = """
+    SELECT  libros.autor_id, libros.titulo, libros.anio, autores.nombre
+    FROM autores
+    JOIN libros ON autores.id = libros.autor_id
+    """
+_SQL_INSERTAR_LIBRO = "INSERT INTO libros (titulo, anio, autor_id) VALUES (?, ?, ?)"
+_SQL_OBTENER_AUTORES = "SELECT * FROM autores"
+# UPDATE ... RETURNING está disponible desde SQLite 3.35
+_SOPORTA_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Conexiones abiertas que obtener_conexion reutiliza en lugar de cerrarlas
+_POOL: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=8)
+# SQLite admite un único escritor a la vez: las conexiones de escritura se serializan
+_BLOQUEO_ESCRITURA = threading.Lock()
+
+def _configurar_conexion(conexion: sqlite3.Connection) -> None:
+    """
+    Aplica los PRAGMA de rendimiento a la conexión y activa la comprobación
+    de las claves foráneas, que SQLite deja desactivada en cada conexión nueva
+
+    El modo WAL con synchronous=NORMAL convierte cada commit en una escritura
+    secuencial en el fichero -wal y deja el fsync para los checkpoints.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+    """
+    conexion.execute("PRAGMA foreign_keys=ON")
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    conexion.execute("PRAGMA temp_store=MEMORY")
+    conexion.execute("PRAGMA cache_size=-8000")
+    conexion.execute("PRAGMA mmap_size=268435456")
+    conexion.execute("PRAGMA journal_size_limit=6144000")
 
 def crear_bd_desde_sql() -> sqlite3.Connection:
     """
@@ -30,20 +71,86 @@ def crear_bd_desde_sql() -> sqlite3.Connection:
     """
     # Implementa aquí la creación de la base de datos:
     # 1. Si el archivo de base de datos existe, elimínalo para empezar desde cero
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+    # (incluidos los ficheros -wal y -shm que pueda haber dejado el modo WAL).
+    # Antes se cierran las conexiones del pool, que apuntan al archivo anterior
+    cerrar_pool()
+    for ruta in (DB_PATH, DB_PATH + '-wal', DB_PATH + '-shm'):
+        if os.path.exists(ruta):
+            os.remove(ruta)
     # 2. Conecta a la base de datos (se creará si no existe)
-    conexion = sqlite3.connect(DB_PATH)
-    # 3. Lee el contenido del archivo SQL
-    with open(SQL_FILE_PATH, 'r') as f:
-        contenido_script = f.read()
-    # 4. Ejecuta el script SQL completo
-    conexion.executescript(contenido_script)
-    # 5. Haz commit de los cambios
-    conexion.commit()
+    conexion = sqlite3.connect(DB_PATH, cached_statements=CACHED_STATEMENTS)
+    _configurar_conexion(conexion)
+    # 3. Lee el contenido del archivo SQL (en binario y decodificado como UTF-8,
+    #    sin la traducción de saltos de línea del modo texto)
+    with open(SQL_FILE_PATH, 'rb') as f:
+        contenido_script = f.read().decode('utf-8')
+    # 4. Ejecuta el script SQL completo en una única transacción y sin comprobar
+    #    las claves foráneas sentencia a sentencia durante la carga (solo en
+    #    esta conexión y solo mientras se carga el script)
+    conexion.execute("PRAGMA foreign_keys=OFF")
+    try:
+        # 5. El COMMIT del final confirma todos los cambios de una vez
+        conexion.executescript(f"BEGIN;\n{contenido_script}\nCOMMIT;")
+    except sqlite3.Error:
+        if conexion.in_transaction:
+            conexion.rollback()
+        conexion.close()
+        raise
+    # A partir de aquí la conexión vuelve a comprobar las claves foráneas,
+    # igual que las del pool
+    conexion.execute("PRAGMA foreign_keys=ON")
     # 6. Devuelve la conexión
     return conexion
 
+@contextmanager
+def obtener_conexion(escritura: bool = False) -> Iterator[sqlite3.Connection]:
+    """
+    Presta una conexión a la base de datos desde el pool
+
+    La conexión se abre (y se configura) solo la primera vez; al salir del
+    bloque 'with' vuelve al pool en lugar de cerrarse, evitando reabrir los
+    ficheros .db, -wal y -shm en cada uso. Las transacciones no confirmadas
+    se descartan al devolverla.
+
+    Args:
+        escritura (bool, opcional): True si la conexión va a modificar datos.
+            Solo se presta una conexión de escritura a la vez.
+
+    Yields:
+        sqlite3.Connection: Conexión a la base de datos SQLite
+    """
+    if escritura:
+        _BLOQUEO_ESCRITURA.acquire()
+    try:
+        try:
+            conexion = _POOL.get_nowait()
+        except queue.Empty:
+            conexion = sqlite3.connect(DB_PATH, cached_statements=CACHED_STATEMENTS,
+                                       check_same_thread=False)
+            _configurar_conexion(conexion)
+        try:
+            yield conexion
+        finally:
+            if conexion.in_transaction:
+                conexion.rollback()
+            try:
+                _POOL.put_nowait(conexion)
+            except queue.Full:
+                conexion.close()
+    finally:
+        if escritura:
+            _BLOQUEO_ESCRITURA.release()
+
+def cerrar_pool() -> None:
+    """
+    Cierra todas las conexiones que quedan en el pool
+    """
+    while True:
+        try:
+            _POOL.get_nowait().close()
+        except queue.Empty:
+            break
+
 def obtener_libros(conexion: sqlite3.Connection) -> List[Tuple]:
     """
     Obtiene la lista de libros con información de sus autores
@@ -58,15 +165,8 @@ def obtener_libros(conexion: sqlite3.Connection) -> List[Tuple]:
     # 1. Crea un cursor a partir de la conexión
     cursor = conexion.cursor()
     # 2. Ejecuta una consulta JOIN para obtener los libros con sus autores
-    # Creamos la consulta JOIN
-    consultar_libros = ( """
-    SELECT  libros.autor_id, libros.titulo, libros.anio, autores.nombre 
-    FROM autores
-    JOIN libros ON autores.id = libros.autor_id
-    """
-    )
     # Ejecutamos la sentencia SQL
-    cursor.execute(consultar_libros)
+    cursor.execute(_SQL_OBTENER_LIBROS)
     # Obtenemos todos los resultados
     resultados = cursor.fetchall()
     # 3. Retorna los resultados como una lista de tuplas
@@ -84,14 +184,18 @@ def agregar_libro(conexion: sqlite3.Connection, titulo: str, anio: int, autor_id
 
     Returns:
         int: ID del nuevo libro insertado
+
+    Raises:
+        sqlite3.IntegrityError: Si no existe un autor con ese autor_id
+
+    No confirma la transacción: quien llama debe hacer commit (por ejemplo con 'with conexion:').
     """
     # Implementa aquí la inserción del libro:
     # 1. Crea un cursor a partir de la conexión
     cursor = conexion.cursor()
     # 2. Ejecuta una consulta INSERT INTO para añadir el libro
-    cursor.execute('INSERT INTO libros (titulo, anio, autor_id) VALUES (?, ?, ?)', (titulo, anio, autor_id) )    
-    # 3. Haz commit de los cambios
-    conexion.commit()
+    cursor.execute(_SQL_INSERTAR_LIBRO, (titulo, anio, autor_id))
+    # 3. El commit lo hace quien llama, para agrupar varias operaciones en una transacción
     # 4. Retorna el ID del nuevo libro (usar cursor.lastrowid)
     return cursor.lastrowid
 
@@ -109,35 +213,45 @@ def actualizar_libro(conexion: sqlite3.Connection, libro_id: int, nuevo_titulo:
 
     Returns:
         bool: True si se actualizó correctamente, False si no se encontró el libro
+
+    Raises:
+        sqlite3.IntegrityError: Si nuevo_autor_id no corresponde a ningún autor
+
+    No confirma la transacción: quien llama debe hacer commit (por ejemplo con 'with conexion:').
     """
     # Implementa aquí la actualización del libro:
     # 1. Crea un cursor a partir de la conexión
     cursor = conexion.cursor()
-    # 2. Verifica primero que el libro existe
-    cursor.execute("SELECT 1 FROM libros WHERE id = ? LIMIT 1", (libro_id,))
-    if cursor.fetchone:
-    # 3. Prepara la consulta UPDATE con los campos que no son None
-        # Construimos por partes la consulta UPDATE - WHERE
-        consulta = ("UPDATE libros SET ")
-        var_updates = []
-        # Añadimos las diferentes partes de la consulta 
-        if nuevo_titulo is not None:
-            var_updates.append(f"titulo = '{nuevo_titulo}'")
-        if nuevo_anio is not None:
-            var_updates.append(f"anio = '{nuevo_anio}'")
-        if nuevo_autor_id is not None:
-            var_updates.append(f"autor_id = '{nuevo_autor_id}'")
-        if var_updates:
-            consulta += ", ".join(var_updates)
-            consulta += f"WHERE libros.id = '{libro_id}'"
-    # 4. Ejecuta la consulta y haz commit de los cambios
-        cursor.execute(consulta)
-        conexion.commit()
-    # 5. Retorna True si se modificó alguna fila, False en caso contrario
-    if cursor.rowcount > 0:
-        return True
-    else:
+    # 2. Prepara la consulta UPDATE con los campos que no son None
+    # Construimos por partes la consulta UPDATE - WHERE con parámetros (?),
+    # así SQLite reutiliza la sentencia preparada y los enteros no pasan por TEXT
+    var_updates = []
+    valores = []
+    # Añadimos las diferentes partes de la consulta 
+    if nuevo_titulo is not None:
+        var_updates.append("titulo = ?")
+        valores.append(nuevo_titulo)
+    if nuevo_anio is not None:
+        var_updates.append("anio = ?")
+        valores.append(nuevo_anio)
+    if nuevo_autor_id is not None:
+        var_updates.append("autor_id = ?")
+        valores.append(nuevo_autor_id)
+    # Si no hay nada que actualizar no se ha modificado ninguna fila
+    if not var_updates:
         return False
+    consulta = f"UPDATE libros SET {', '.join(var_updates)} WHERE id = ?"
+    # 3. Ejecuta la consulta (el commit lo hace quien llama). No hace falta
+    # comprobar antes con un SELECT que el libro existe: con RETURNING el
+    # propio UPDATE devuelve el id de la fila modificada, si la hay
+    if _SOPORTA_RETURNING:
+        cursor.execute(consulta + " RETURNING id", (*valores, libro_id))
+        # Leemos todas las filas para que la sentencia termine de ejecutarse
+        # 4. Retorna True si se modificó alguna fila, False en caso contrario
+        return len(cursor.fetchall()) > 0
+    # En versiones anteriores de SQLite usamos el número de filas afectadas
+    cursor.execute(consulta, (*valores, libro_id))
+    return cursor.rowcount > 0
 
 def obtener_autores(conexion: sqlite3.Connection) -> List[Tuple]:
     """
@@ -153,9 +267,8 @@ def obtener_autores(conexion: sqlite3.Connection) -> List[Tuple]:
     # 1. Crea un cursor a partir de la conexión
     cursor = conexion.cursor()
     # 2. Ejecuta una consulta SELECT para obtener los autores
-    consultar_libros = ( "SELECT * FROM autores")
     # Ejecutamos la sentencia SQL
-    cursor.execute(consultar_libros)
+    cursor.execute(_SQL_OBTENER_AUTORES)
     # Obtenemos todos los resultados
     resultados = cursor.fetchall()
     # 3. Retorna los resultados como una lista de tuplas
@@ -177,15 +290,15 @@ if __name__ == "__main__":
         # Mostrar los autores disponibles
         print("\n--- Autores disponibles ---")
         autores = obtener_autores(conexion)
-        for autor_id, nombre in autores:
-            print(f"ID: {autor_id} - {nombre}")
+        if autores:
+            print("\n".join(f"ID: {autor_id} - {nombre}" for autor_id, nombre in autores))
 
         # Mostrar los datos de libros y autores
         print("\n--- Libros y autores en la base de datos ---")
         libros = obtener_libros(conexion)
-        for libro in libros:
-            libro_id, titulo, anio, autor = libro
-            print(f"ID: {libro_id} - {titulo} ({anio}) de {autor}")
+        if libros:
+            print("\n".join(f"ID: {libro_id} - {titulo} ({anio}) de {autor}"
+                            for libro_id, titulo, anio, autor in libros))
 
         # Agregar un nuevo libro
         print("\n--- Agregar un nuevo libro ---")
@@ -194,15 +307,17 @@ if __name__ == "__main__":
         titulo_nuevo = "Violeta"
         anio_nuevo = 2022
 
-        nuevo_id = agregar_libro(conexion, titulo_nuevo, anio_nuevo, autor_id)
+        # 'with conexion' confirma la transacción al salir del bloque
+        with conexion:
+            nuevo_id = agregar_libro(conexion, titulo_nuevo, anio_nuevo, autor_id)
         print(f"Libro agregado con ID: {nuevo_id}")
 
         # Mostrar la lista actualizada de libros
         print("\n--- Lista actualizada de libros ---")
         libros = obtener_libros(conexion)
-        for libro in libros:
-            libro_id, titulo, anio, autor = libro
-            print(f"ID: {libro_id} - {titulo} ({anio}) de {autor}")
+        if libros:
+            print("\n".join(f"ID: {libro_id} - {titulo} ({anio}) de {autor}"
+                            for libro_id, titulo, anio, autor in libros))
 
         # Actualizar un libro
         print("\n--- Actualizar un libro existente ---")
@@ -210,7 +325,8 @@ if __name__ == "__main__":
         libro_a_actualizar = nuevo_id
         nuevo_anio = 2023  # Corregir el año de publicación
 
-        actualizado = actualizar_libro(conexion, libro_a_actualizar, nuevo_anio=nuevo_anio)
+        with conexion:
+            actualizado = actualizar_libro(conexion, libro_a_actualizar, nuevo_anio=nuevo_anio)
         if actualizado:
             print(f"Libro con ID {libro_a_actualizar} actualizado correctamente")
         else:
@@ -219,9 +335,9 @@ if __name__ == "__main__":
         # Mostrar la lista final de libros
         print("\n--- Lista final de libros ---")
         libros = obtener_libros(conexion)
-        for libro in libros:
-            libro_id, titulo, anio, autor = libro
-            print(f"ID: {libro_id} - {titulo} ({anio}) de {autor}")
+        if libros:
+            print("\n".join(f"ID: {libro_id} - {titulo} ({anio}) de {autor}"
+                            for libro_id, titulo, anio, autor in libros))
 
     except sqlite3.Error as e:
         print(f"Error de SQLite: {e}")
@@ -7,7 +7,7 @@ import pytest
 import sqlite3
 import os
 from ej3a2 import (crear_bd_desde_sql, obtener_libros, agregar_libro,
-                 actualizar_libro, obtener_autores)
+                 actualizar_libro, obtener_autores, obtener_conexion, cerrar_pool)
 
 # Path to SQL script and database
 SQL_FILE_PATH = os.path.join(os.path.dirname(__file__), 'test.sql')
@@ -247,3 +247,57 @@ def test_actualizar_libro(conexion_bd):
     libro_id_inexistente = 9999
     actualizado3 = actualizar_libro(conexion_bd, libro_id_inexistente, nuevo_titulo="No debería actualizarse")
     assert actualizado3 is False, "La función debería devolver False cuando el libro no existe"
+
+def test_actualizar_libro_titulo_con_comillas(conexion_bd):
+    """
+    Prueba que actualizar_libro admite valores con comillas simples
+    Verifica que los valores se pasan como parámetros y no se concatenan en el SQL
+    """
+    libro_id = agregar_libro(conexion_bd, "Libro original", 2000, 1)
+
+    nuevo_titulo = "El otoño del patriarca ('edición' revisada)"
+    actualizado = actualizar_libro(conexion_bd, libro_id, nuevo_titulo=nuevo_titulo, nuevo_anio=1975)
+    assert actualizado is True
+
+    cursor = conexion_bd.cursor()
+    cursor.execute("SELECT titulo, anio FROM libros WHERE id = ?", (libro_id,))
+    libro = cursor.fetchone()
+
+    assert libro[0] == nuevo_titulo
+    assert libro[1] == 1975
+    assert isinstance(libro[1], int), "El año debe guardarse como entero"
+
+def test_obtener_conexion(conexion_bd):
+    """
+    Prueba la función obtener_conexion
+    Verifica que las conexiones del pool leen lo que se confirma con 'with conexion'
+    """
+    try:
+        with obtener_conexion(escritura=True) as conn:
+            with conn:
+                libro_id = agregar_libro(conn, "Libro desde el pool", 2024, 1)
+
+        with obtener_conexion() as conn_lectura:
+            assert conn_lectura is conn, "La conexión debería reutilizarse"
+            cursor = conn_lectura.cursor()
+            cursor.execute("SELECT titulo FROM libros WHERE id = ?", (libro_id,))
+            assert cursor.fetchone()[0] == "Libro desde el pool"
+
+        # La conexión del fixture ve el cambio confirmado
+        assert len(obtener_libros(conexion_bd)) == 7
+    finally:
+        cerrar_pool()
+
+def test_obtener_conexion_claves_foraneas(conexion_bd):
+    """
+    Prueba que las conexiones del pool también rechazan un autor_id inexistente
+    """
+    try:
+        with obtener_conexion(escritura=True) as conn:
+            with pytest.raises(sqlite3.IntegrityError):
+                agregar_libro(conn, "Libro sin autor", 2024, 999)
+
+        # El libro no se ha guardado
+        assert len(obtener_libros(conexion_bd)) == 6
+    finally:
+        cerrar_pool()
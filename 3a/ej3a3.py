@@ -15,15 +15,73 @@ import sqlite3
 import pandas as pd
 import os
 import json
-from typing import List, Dict, Any, Optional, Tuple, Union
+import queue
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterator
+
+# orjson es opcional: si está instalado serializa JSON bastante más rápido que json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Ruta a la base de datos SQLite
 DB_PATH = os.path.join(os.path.dirname(__file__), 'ventas_comerciales.db')
+# Número de sentencias preparadas que cada conexión mantiene en caché
+CACHED_STATEMENTS = 256
+# Filas que pandas lee en cada bloque al crear los DataFrames
+TAMANO_BLOQUE = 50_000
+# Columnas que se convierten a fechas al crear los DataFrames
+COLUMNAS_FECHA = ['fecha', 'fecha_contratacion']
+
+# Pool de conexiones ya abiertas y configuradas (ver obtener_conexion)
+_POOL: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=8)
+# Garantiza que solo haya una conexión de escritura prestada a la vez
+_BLOQUEO_ESCRITURA = threading.Lock()
+
+def _configurar_conexion(conexion: sqlite3.Connection) -> None:
+    """
+    Configura la conexión con synchronous=NORMAL, tablas temporales en
+    memoria, 8 MB de caché de páginas y lectura mediante mmap. Son ajustes
+    de la conexión: no modifican el archivo de la base de datos
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+    """
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    conexion.execute("PRAGMA temp_store=MEMORY")
+    conexion.execute("PRAGMA cache_size=-8000")
+    conexion.execute("PRAGMA mmap_size=268435456")
+    conexion.execute("PRAGMA journal_size_limit=6144000")
+
+def migrar_bd() -> None:
+    """
+    Prepara el archivo de la base de datos una sola vez: lo pasa a modo WAL
+    (que se guarda en el propio archivo) y crea los índices de las claves
+    foráneas usadas en los JOIN. ventas_comerciales.db ya está migrada; solo
+    hace falta volver a ejecutarla si se sustituye el archivo
+    """
+    if not os.path.exists(DB_PATH):
+        raise FileNotFoundError(f"La base de datos no existe.")
+    conexion = sqlite3.connect(DB_PATH)
+    try:
+        conexion.execute("PRAGMA journal_mode=WAL")
+        with conexion:
+            conexion.execute("CREATE INDEX IF NOT EXISTS idx_ventas_producto ON ventas(producto_id)")
+            conexion.execute("CREATE INDEX IF NOT EXISTS idx_ventas_vendedor ON ventas(vendedor_id)")
+            conexion.execute("CREATE INDEX IF NOT EXISTS idx_vendedores_region ON vendedores(region_id)")
+    finally:
+        conexion.close()
 
-def conectar_bd() -> sqlite3.Connection:
+def conectar_bd(check_same_thread: bool = True) -> sqlite3.Connection:
     """
     Conecta a una base de datos SQLite existente
 
+    Args:
+        check_same_thread (bool, opcional): Si es False la conexión puede usarse
+            desde otros hilos (el pool de obtener_conexion lo necesita)
+
     Returns:
         sqlite3.Connection: Objeto de conexión a la base de datos SQLite
     """
@@ -32,12 +90,78 @@ def conectar_bd() -> sqlite3.Connection:
     if not os.path.exists(DB_PATH):
         raise FileNotFoundError(f"La base de datos no existe.")
     # 2. Conecta a la base de datos
-    conexion = sqlite3.connect(DB_PATH)
+    conexion = sqlite3.connect(DB_PATH, cached_statements=CACHED_STATEMENTS,
+                               check_same_thread=check_same_thread)
+    _configurar_conexion(conexion)
     # 3. Configura la conexión para que devuelva las filas como diccionarios (opcional)
     conexion.row_factory = sqlite3.Row
     # 4. Retorna la conexión
     return conexion
 
+@contextmanager
+def obtener_conexion(escritura: bool = False) -> Iterator[sqlite3.Connection]:
+    """
+    Obtiene una conexión reutilizable a la base de datos
+
+    Toma una conexión libre del pool o, si no hay ninguna, abre una nueva con
+    conectar_bd. Al terminar el bloque 'with' la conexión se devuelve al pool
+    (descartando lo que no se haya confirmado) y solo se cierra si está lleno.
+
+    Args:
+        escritura (bool, opcional): Indica que la conexión va a escribir; las
+            conexiones de escritura se prestan de una en una
+
+    Yields:
+        sqlite3.Connection: Conexión a la base de datos SQLite
+    """
+    if escritura:
+        _BLOQUEO_ESCRITURA.acquire()
+    try:
+        try:
+            conexion = _POOL.get_nowait()
+        except queue.Empty:
+            conexion = conectar_bd(check_same_thread=False)
+        try:
+            yield conexion
+        finally:
+            if conexion.in_transaction:
+                conexion.rollback()
+            try:
+                _POOL.put_nowait(conexion)
+            except queue.Full:
+                conexion.close()
+    finally:
+        if escritura:
+            _BLOQUEO_ESCRITURA.release()
+
+def cerrar_pool() -> None:
+    """
+    Cierra las conexiones que hay en el pool
+    """
+    while True:
+        try:
+            _POOL.get_nowait().close()
+        except queue.Empty:
+            break
+
+def _tablas_usuario(conexion: sqlite3.Connection) -> List[str]:
+    """
+    Devuelve los nombres de las tablas de la base de datos, sin las tablas
+    internas de SQLite (sqlite_sequence, sqlite_stat1, ...)
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+
+    Returns:
+        List[str]: Nombres de las tablas
+    """
+    consulta = """
+        SELECT name
+        FROM sqlite_master
+        WHERE type = 'table' AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\'
+        """
+    return [tabla[0] for tabla in conexion.execute(consulta)]
+
 def convertir_a_json(conexion: sqlite3.Connection) -> Dict[str, List[Dict[str, Any]]]:
     """
     Convierte los datos de la base de datos en un objeto compatible con JSON
@@ -52,35 +176,76 @@ def convertir_a_json(conexion: sqlite3.Connection) -> Dict[str, List[Dict[str, A
     # Implementa aquí la conversión de datos a formato JSON:
     # 1. Crea un diccionario vacío para almacenar el resultado
     results = {}
-    tables_list = []
 
     # 2. Obtén la lista de tablas de la base de datos
+    tables_list = _tablas_usuario(conexion)
+    # Este cursor devuelve tuplas en lugar de sqlite3.Row: cada fila se convierte
+    # directamente en diccionario sin crear antes el objeto Row intermedio
     cursor = conexion.cursor()
-    consulta_nombre_tablas = ("""
-                SELECT name
-                FROM sqlite_master
-                WHERE type="table"
-                """)
-    cursor.execute(consulta_nombre_tablas)
-    tables = cursor.fetchall()
-
-    for table in tables:
-        tables_list.append(table[0])
+    cursor.row_factory = None
     # 3. Para cada tabla:
     #    a. Ejecuta una consulta SELECT * FROM tabla
     for table in tables_list:
         consulta = f"SELECT * FROM {table}"
         cursor.execute(consulta)
-    #    b. Obtén los nombres de las columnas
+    #    b. Obtén los nombres de las columnas (una sola vez por tabla)
         columns_name = [descripcion[0] for descripcion in cursor.description]
     #    c. Convierte cada fila a un diccionario (clave: nombre columna, valor: valor celda)
-        rows = cursor.fetchall()
-        rows_list = [dict(row) for row in rows]
+    #       recorriendo el cursor directamente, sin materializar antes la tabla con fetchall()
+        rows_list = [dict(zip(columns_name, row)) for row in cursor]
     #    d. Añade el diccionario a una lista para esa tabla
         results[table] = rows_list
     # 4. Retorna el diccionario completo con todas las tablas
     return results
 
+def _a_json(obj: Any) -> bytes:
+    """
+    Serializa un objeto a JSON en UTF-8, con orjson si está disponible
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+def volcar_json(conexion: sqlite3.Connection, ruta: str) -> None:
+    """
+    Guarda todas las tablas de la base de datos en un archivo JSON
+
+    A diferencia de convertir_a_json, no construye el diccionario completo en
+    memoria: cada fila se escribe en el archivo en cuanto se lee del cursor.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        ruta (str): Ruta del archivo JSON de salida
+    """
+    cursor = conexion.cursor()
+    # Filas como tuplas: se combinan con los nombres de columna sin pasar por sqlite3.Row
+    cursor.row_factory = None
+    tablas = _tablas_usuario(conexion)
+
+    with open(ruta, 'wb') as f:
+        f.write(b'{')
+        for i, tabla in enumerate(tablas):
+            if i > 0:
+                f.write(b',')
+            f.write(b'\n' + _a_json(tabla) + b': [')
+            cursor.execute(f"SELECT * FROM {tabla}")
+            columnas = [descripcion[0] for descripcion in cursor.description]
+            # Recorremos el cursor directamente para no cargar toda la tabla
+            for j, fila in enumerate(cursor):
+                f.write(b',\n' if j > 0 else b'\n')
+                f.write(_a_json(dict(zip(columnas, fila))))
+            f.write(b'\n]')
+        f.write(b'\n}\n')
+
+def _leer_dataframe(consulta: str, conexion: sqlite3.Connection) -> pd.DataFrame:
+    """
+    Ejecuta una consulta y devuelve el resultado como DataFrame, leyéndolo en
+    bloques de TAMANO_BLOQUE filas para acotar la memoria intermedia
+    """
+    bloques = pd.read_sql_query(consulta, conexion, chunksize=TAMANO_BLOQUE,
+                                parse_dates=COLUMNAS_FECHA, coerce_float=False)
+    return pd.concat(bloques, ignore_index=True)
+
 def convertir_a_dataframes(conexion: sqlite3.Connection) -> Dict[str, pd.DataFrame]:
     """
     Extrae los datos de la base de datos a DataFrames de pandas
@@ -96,58 +261,31 @@ def convertir_a_dataframes(conexion: sqlite3.Connection) -> Dict[str, pd.DataFra
     # 1. Crea un diccionario vacío para los DataFrames
     df_dict = {}
     # 2. Obtén la lista de tablas de la base de datos
-    tables_list = []
-    cursor = conexion.cursor()
-    consulta_nombre_tablas = ("""
-                SELECT name
-                FROM sqlite_master
-                WHERE type="table"
-                """)
-    cursor.execute(consulta_nombre_tablas)
-    tables = cursor.fetchall()
-    for table in tables:
-        tables_list.append(table[0])
+    tables_list = _tablas_usuario(conexion)
     # 3. Para cada tabla, crea un DataFrame usando pd.read_sql_query
     for table in tables_list:
-        df_table = pd.read_sql_query(f"SELECT * FROM {table}", conexion)
+        df_table = _leer_dataframe(f"SELECT * FROM {table}", conexion)
         df_dict[table] = df_table
-    # 4. Añade consultas JOIN para relaciones importantes:
+    # 4. Añade combinaciones (JOIN) para relaciones importantes. Las tablas ya
+    #    están cargadas, así que se combinan en pandas con pd.merge en lugar de
+    #    volver a leer ventas, productos y vendedores con nuevas consultas SQL
+    ventas = df_dict['ventas']
+    productos = df_dict['productos']
+    vendedores = df_dict['vendedores']
+    regiones = df_dict['regiones']
     #    - Ventas con información de productos
-    # Creamos la consulta JOIN
-    ventas_productos = ( """
-    SELECT  productos.nombre, productos.categoria, productos.precio_unitario, ventas.fecha, ventas.vendedor_id, ventas.cantidad
-    FROM productos
-    JOIN ventas ON productos.id = ventas.producto_id
-    """
-    )
-    # Creamos el df con los resultados
-    df_ventas_productos = pd.read_sql_query(ventas_productos, conexion)
-    # Añadimos al diccionario
-    df_dict[ventas_productos] = df_ventas_productos
+    df_ventas_productos = productos.merge(ventas, left_on='id', right_on='producto_id')
+    df_dict['ventas_productos'] = df_ventas_productos[
+        ['nombre', 'categoria', 'precio_unitario', 'fecha', 'vendedor_id', 'cantidad']]
     #    - Ventas con información de vendedores
-    # Creamos la consulta JOIN
-    ventas_vendedores = ( """
-    SELECT  vendedores.nombre, vendedores.apellido, vendedores.fecha_contratacion, ventas.fecha, ventas.vendedor_id, ventas.cantidad
-    FROM vendedores
-    JOIN ventas ON vendedores.id = ventas.vendedor_id
-    """
-    )
-    # Creamos el df con los resultados
-    df_ventas_vendedores = pd.read_sql_query(ventas_vendedores, conexion)
-    # Añadimos al diccionario
-    df_dict[ventas_vendedores] = df_ventas_vendedores
-    #    - Vendedores con regiones
-    # Creamos la consulta JOIN
-    vendedores_regiones = ( """
-    SELECT  vendedores.id, vendedores.nombre, vendedores.apellido, vendedores.fecha_contratacion, regiones.id, regiones.nombre, regiones.pais
-    FROM vendedores
-    JOIN regiones ON regiones.id = vendedores.region_id
-    """
-    )
-    # Creamos el df con los resultados
-    df_vendedores_regiones = pd.read_sql_query(vendedores_regiones, conexion)
-    # Añadimos al diccionario
-    df_dict[vendedores_regiones] = df_vendedores_regiones
+    df_ventas_vendedores = vendedores.merge(ventas, left_on='id', right_on='vendedor_id')
+    df_dict['ventas_vendedores'] = df_ventas_vendedores[
+        ['nombre', 'apellido', 'fecha_contratacion', 'fecha', 'vendedor_id', 'cantidad']]
+    #    - Vendedores con regiones (las columnas de la región llevan el sufijo '_region')
+    df_vendedores_regiones = vendedores.merge(regiones, left_on='region_id', right_on='id',
+                                              suffixes=('', '_region'))
+    df_dict['vendedores_regiones'] = df_vendedores_regiones[
+        ['id', 'nombre', 'apellido', 'fecha_contratacion', 'id_region', 'nombre_region', 'pais']]
     # 5. Retorna el diccionario con todos los DataFrames
     return df_dict
 
@@ -159,10 +297,7 @@ if __name__ == "__main__":
         print("Conexión establecida correctamente.")
 
         # Verificar la conexión mostrando las tablas disponibles
-        cursor = conexion.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tablas = cursor.fetchall()
-        print(f"\nTablas en la base de datos: {[t[0] for t in tablas]}")
+        print(f"\nTablas en la base de datos: {_tablas_usuario(conexion)}")
 
         # Conversión a JSON
         print("\n--- Convertir datos a formato JSON ---")
@@ -177,8 +312,7 @@ if __name__ == "__main__":
 
             # Opcional: guardar los datos en un archivo JSON
             ruta_json = os.path.join(os.path.dirname(__file__), 'ventas_comerciales.json')
-            with open(ruta_json, 'w', encoding='utf-8') as f:
-                json.dump(datos_json, f, ensure_ascii=False, indent=2)
+            volcar_json(conexion, ruta_json)
             print(f"Datos guardados en {ruta_json}")
 
         # Conversión a DataFrames de pandas
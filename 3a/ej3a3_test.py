@@ -7,8 +7,11 @@ import pytest
 import sqlite3
 import os
 import json
+import shutil
 import pandas as pd
-from ej3a3 import conectar_bd, convertir_a_json, convertir_a_dataframes
+import ej3a3
+from ej3a3 import (conectar_bd, convertir_a_json, convertir_a_dataframes, volcar_json,
+                   obtener_conexion, cerrar_pool, migrar_bd)
 
 # Path to database file
 DB_PATH = os.path.join(os.path.dirname(__file__), 'ventas_comerciales.db')
@@ -103,6 +106,9 @@ def crear_db_prueba():
         conn.commit()
         conn.close()
 
+        # Índices y modo WAL, como en la base de datos incluida en el repositorio
+        migrar_bd()
+
 @pytest.fixture
 def conexion_bd():
     """
@@ -190,6 +196,55 @@ def test_conectar_bd_data():
         if conn:
             conn.close()
 
+def _indices(conn, tabla):
+    """Devuelve los nombres de los índices de una tabla"""
+    return {fila[1] for fila in conn.execute(f"PRAGMA index_list({tabla})")}
+
+def test_migrar_bd(tmp_path, monkeypatch):
+    """
+    Prueba la función migrar_bd sobre una copia de la base de datos
+    Verifica que crea los índices, activa WAL y se puede ejecutar varias veces
+    """
+    ruta = tmp_path / "ventas_comerciales.db"
+    shutil.copyfile(DB_PATH, ruta)
+    monkeypatch.setattr(ej3a3, "DB_PATH", str(ruta))
+
+    migrar_bd()
+    migrar_bd()
+
+    conn = sqlite3.connect(ruta)
+    try:
+        assert {"idx_ventas_producto", "idx_ventas_vendedor"} <= _indices(conn, "ventas")
+        assert "idx_vendedores_region" in _indices(conn, "vendedores")
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        conn.close()
+
+def test_conectar_bd_indices(conexion_bd):
+    """
+    Verifica que la base de datos ya incluye los índices que crea migrar_bd
+    (si se sustituye el archivo, hay que volver a ejecutar migrar_bd)
+    """
+    assert {"idx_ventas_producto", "idx_ventas_vendedor"} <= _indices(conexion_bd, "ventas")
+    assert "idx_vendedores_region" in _indices(conexion_bd, "vendedores")
+
+def test_obtener_conexion_reutiliza():
+    """
+    Prueba la función obtener_conexion
+    Verifica que la conexión vuelve al pool y se reutiliza en el siguiente uso
+    """
+    cerrar_pool()
+    try:
+        with obtener_conexion() as conn1:
+            cursor = conn1.cursor()
+            cursor.execute("SELECT COUNT(*) FROM ventas;")
+            assert cursor.fetchone()[0] > 0
+
+        with obtener_conexion() as conn2:
+            assert conn2 is conn1
+    finally:
+        cerrar_pool()
+
 def test_convertir_a_json(conexion_bd):
     """
     Prueba la función convertir_a_json
@@ -260,6 +315,19 @@ def test_convertir_a_json_data(conexion_bd):
 
         assert venta_con_producto_valido, "No se encontró ninguna venta con referencia a un producto válido"
 
+def test_volcar_json(conexion_bd, tmp_path):
+    """
+    Prueba la función volcar_json
+    Verifica que el archivo generado contiene los mismos datos que convertir_a_json
+    """
+    ruta = tmp_path / "datos.json"
+    volcar_json(conexion_bd, str(ruta))
+
+    with open(ruta, encoding='utf-8') as f:
+        datos_archivo = json.load(f)
+
+    assert datos_archivo == convertir_a_json(conexion_bd)
+
 def test_convertir_a_dataframes(conexion_bd):
     """
     Prueba la función convertir_a_dataframes
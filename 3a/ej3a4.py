@@ -13,50 +13,127 @@ Tareas:
 Este ejercicio se enfoca en las operaciones básicas de MongoDB desde Python utilizando PyMongo.
 """
 
+import atexit
+import importlib.util
 import subprocess
 import time
 import os
 import sys
-from typing import List, Tuple, Optional
+from typing import Any, Dict, Iterator, List, Tuple, Optional
 
 import pymongo
 from bson.objectid import ObjectId
 
+# Directorio de este módulo, donde está el docker-compose.yml
+_DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
 # Configuración de MongoDB (la debes obtener de "docker-compose.yml"):
 DB_NAME = 'biblioteca'
 MONGODB_PORT = 27017
 MONGODB_HOST = 'localhost'
 MONGODB_USERNAME = 'testuser'
 MONGODB_PASSWORD = 'testpass'
+# Las transacciones necesitan un replica set (en este caso de un solo nodo)
+MONGODB_REPLICA_SET = 'rs0'
+CONNECTION_STRING = f'mongodb://{MONGODB_USERNAME}:{MONGODB_PASSWORD}@{MONGODB_HOST}:{MONGODB_PORT}/'
+# Tamaño del pool de conexiones del cliente
+MONGODB_MIN_POOL = 10
+MONGODB_MAX_POOL = 200
+# Compresión del protocolo de red. zstd y snappy son opcionales: solo se piden
+# si 'zstandard' o 'python-snappy' están instalados (zlib viene con Python)
+MONGODB_COMPRESORES = ','.join(
+    compresor
+    for compresor, modulo in (('zstd', 'zstandard'), ('snappy', 'snappy'), ('zlib', 'zlib'))
+    if importlib.util.find_spec(modulo) is not None
+)
+
+# Cliente compartido por todo el módulo (ver 'obtener_cliente')
+_CLIENTE: Optional[pymongo.MongoClient] = None
+
+# Documentos que el servidor devuelve en cada lote de un cursor
+TAMANO_LOTE = 500
+
+# Proyección y orden de la consulta de 'iter_libros'
+_PROYECCION_LIBROS = {'titulo': 1, 'anio': 1, 'autor_nombre': 1, '_id': 0}
+_ORDEN_LIBROS = [('autor_nombre', 1), ('titulo', 1)]
+# Solo los libros con autor conocido, igual que hacía la unión con 'autores'
+_FILTRO_LIBROS = {'autor_nombre': {'$ne': None}}
+
+# Rellena 'autor_nombre' en los libros que no lo tienen (guardados antes de
+# desnormalizar el nombre, o con un autor que entonces no existía). Los libros
+# cuyo autor sigue sin existir no se modifican
+_PIPELINE_RELLENAR_AUTOR_NOMBRE = [
+    {'$match': {'autor_nombre': None}},
+    {'$lookup': {
+        'from': 'autores',
+        'localField': 'autor_id',
+        'foreignField': '_id',
+        'as': 'autor'
+    }},
+    {'$unwind': '$autor'},
+    {'$project': {'autor_nombre': '$autor.nombre'}},
+    {'$merge': {
+        'into': 'libros',
+        'on': '_id',
+        'whenMatched': 'merge',
+        'whenNotMatched': 'discard'
+    }}
+]
+
+# Etapas de 'buscar_libros_por_autor' que siguen al '$match' por nombre
+_PIPELINE_LIBROS_AUTOR = [
+    # Del autor solo hace falta el '_id' para la unión: con el índice
+    # (nombre, _id) el '$match' y esta etapa no leen ningún documento
+    {
+        '$project': {'_id': 1}
+    },
+    # Se unen los libros cuyo 'autor_id' coincide con el '_id' del autor.
+    # El 'pipeline' interno deja en cada libro solo 'titulo' y 'anio', así los
+    # documentos que pasan por '$unwind' y '$sort' son lo más pequeños posible.
+    {
+        '$lookup': {
+            'from': 'libros',
+            'localField': '_id',
+            'foreignField': 'autor_id',
+            'pipeline': [
+                {'$project': {'titulo': 1, 'anio': 1, '_id': 0}}
+            ],
+            'as': 'libros'
+        }
+    },
+    # Un documento de salida por cada libro del autor
+    {
+        '$unwind': '$libros'
+    },
+    # Se ordenan los libros por el campo 'anio' en orden ascendente (1)
+    {
+        '$sort': {'libros.anio': 1}
+    },
+    # Se reforman los documentos de salida, seleccionando campos específicos
+    {
+        '$project': {
+            '_id': 0,
+            'titulo': '$libros.titulo',
+            'anio': '$libros.anio'
+        }
+    }
+]
 
 def verificar_docker_instalado() -> bool:
     """
     Verifica si Docker está instalado en el sistema y el usuario tiene permisos
     """
     try:
-        # Verificar si docker está instalado
-        result = subprocess.run(["docker", "--version"],
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE,
-                               text=True)
-        if result.returncode != 0:
-            return False
-
-        # Verificar si docker-compose está instalado
-        result = subprocess.run(["docker", "compose", "version"],
+        # Una sola llamada comprueba todo: 'docker compose ls' falla si docker
+        # o el plugin compose no están instalados y también si el usuario no
+        # tiene permisos para hablar con el demonio de Docker
+        result = subprocess.run(["docker", "compose", "ls"],
                                stdout=subprocess.PIPE,
                                stderr=subprocess.PIPE,
-                               text=True)
-        if result.returncode != 0:
-            return False
-
-        # Verificar permisos de Docker
-        result = subprocess.run(["docker", "ps"],
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE,
-                               text=True)
+                               text=True,
+                               timeout=10)
         return result.returncode == 0
-    except FileNotFoundError:
+    except (FileNotFoundError, subprocess.TimeoutExpired):
         return False
 
 def iniciar_mongodb_docker() -> bool:
@@ -64,13 +141,10 @@ def iniciar_mongodb_docker() -> bool:
     Inicia MongoDB usando Docker Compose
     """
     try:
-        # Obtener la ruta al directorio actual donde está el docker-compose.yml
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-
         # Detener cualquier contenedor previo
         subprocess.run(
             ["docker", "compose", "down"],
-            cwd=current_dir,
+            cwd=_DIRECTORIO,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             check=True
@@ -79,7 +153,7 @@ def iniciar_mongodb_docker() -> bool:
         # Iniciar MongoDB con docker-compose
         result = subprocess.run(
             ["docker", "compose", "up", "-d"],
-            cwd=current_dir,
+            cwd=_DIRECTORIO,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True
@@ -89,8 +163,11 @@ def iniciar_mongodb_docker() -> bool:
             print(f"Error al iniciar MongoDB: {result.stderr}")
             return False
 
-        # Dar tiempo para que MongoDB se inicie completamente
-        time.sleep(5)
+        # Esperar a que MongoDB acepte conexiones
+        if not esperar_mongodb():
+            print("MongoDB no responde tras iniciar el contenedor")
+            return False
+        iniciar_replica_set()
         return True
 
     except subprocess.CalledProcessError as e:
@@ -105,10 +182,9 @@ def detener_mongodb_docker() -> None:
     Detiene el contenedor de MongoDB
     """
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
         subprocess.run(
             ["docker", "compose", "down"],
-            cwd=current_dir,
+            cwd=_DIRECTORIO,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             check=True
@@ -116,15 +192,81 @@ def detener_mongodb_docker() -> None:
     except Exception as e:
         print(f"Error al detener MongoDB: {e}")
 
+def esperar_mongodb() -> bool:
+    """
+    Espera a que MongoDB responda a 'ping', reintentando con esperas que se
+    duplican cada vez en lugar de esperar siempre un tiempo fijo
+    """
+    client = pymongo.MongoClient(CONNECTION_STRING, directConnection=True,
+                                 serverSelectionTimeoutMS=250)
+    try:
+        for espera in (0.1, 0.2, 0.4, 0.8, 1.6, 3.2, 6.4):
+            try:
+                client.admin.command('ping')
+                return True
+            except pymongo.errors.PyMongoError:
+                time.sleep(espera)
+        return False
+    finally:
+        client.close()
+
+def iniciar_replica_set() -> None:
+    """
+    Inicia el replica set de un solo nodo y espera a que sea primario
+    """
+    client = pymongo.MongoClient(CONNECTION_STRING, directConnection=True)
+    try:
+        try:
+            client.admin.command('replSetInitiate', {
+                '_id': MONGODB_REPLICA_SET,
+                'members': [{'_id': 0, 'host': f'{MONGODB_HOST}:{MONGODB_PORT}'}]
+            })
+        except pymongo.errors.OperationFailure as e:
+            # 23 = AlreadyInitialized: el contenedor ya tenía el replica set
+            if e.code != 23:
+                raise
+        # Esperar a que el nodo sea elegido primario (acepta escrituras)
+        for _ in range(50):
+            if client.admin.command('hello').get('isWritablePrimary'):
+                return
+            time.sleep(0.2)
+    finally:
+        client.close()
+
+def obtener_cliente() -> pymongo.MongoClient:
+    """
+    Devuelve el cliente de MongoDB del módulo, creándolo la primera vez.
+    Un MongoClient mantiene su propio pool de conexiones, así que se reutiliza
+    uno solo en lugar de crear (y descubrir la topología de) uno nuevo cada vez
+    """
+    global _CLIENTE
+    if _CLIENTE is None:
+        _CLIENTE = pymongo.MongoClient(
+            CONNECTION_STRING,
+            minPoolSize=MONGODB_MIN_POOL,
+            maxPoolSize=MONGODB_MAX_POOL,
+            compressors=MONGODB_COMPRESORES,
+            zlibCompressionLevel=3
+        )
+    return _CLIENTE
+
+@atexit.register
+def cerrar_cliente() -> None:
+    """
+    Cierra el cliente compartido y sus conexiones
+    """
+    global _CLIENTE
+    if _CLIENTE is not None:
+        _CLIENTE.close()
+        _CLIENTE = None
+
 def crear_conexion() -> pymongo.database.Database:
     """
-    Crea y devuelve una conexión a la base de datos MongoDB
+    Devuelve una conexión a la base de datos MongoDB
     """
     # Debes conectarte a la base de datos MongoDB usando PyMongo
-    CONNECTION_STRING = f'mongodb://{MONGODB_USERNAME}:{MONGODB_PASSWORD}@{MONGODB_HOST}:{MONGODB_PORT}/'
-    client = pymongo.MongoClient(CONNECTION_STRING)
-    # Creamos la base de datos
-    db = client[DB_NAME]
+    # Usamos la base de datos sobre el cliente compartido
+    db = obtener_cliente()[DB_NAME]
     return db
 
 def crear_colecciones(db: pymongo.database.Database) -> None:
@@ -136,135 +278,127 @@ def crear_colecciones(db: pymongo.database.Database) -> None:
     # Debes crear colecciones para 'autores' y 'libros'
     # 1. Crear colección de autores con índice por nombre
     collection_autores = db["autores"]
-    # Creamos un índice ascendente en el campo 'nombre', el '1' significa orden ascendente
-    collection_autores.create_index([('nombre', 1)])
-    # 2. Crear colección de libros con índices
+    # Creamos un índice ascendente en el campo 'nombre', el '1' significa orden ascendente.
+    # Incluye también '_id' para que buscar un autor por nombre y obtener solo su
+    # '_id' se resuelva con el índice, sin leer el documento
+    collection_autores.create_index([('nombre', 1), ('_id', 1)])
+    # 2. Crear colección de libros con índices. Solo se crean los índices que
+    # usan las consultas: cada índice de más encarece inserciones y actualizaciones
     collection_libros = db["libros"]
-    # Creamos un índice ascendente en el campo 'nombre' - El '1' indica orden ascendente
-    collection_libros.create_index([('titulo', 1)])
-    collection_libros.create_index([('anio', 1)])
-    collection_libros.create_index([('autor_id', 1)])
+    # Índice compuesto (igualdad, orden, proyección) para 'buscar_libros_por_autor':
+    # filtra por 'autor_id', ordena por 'anio' y contiene 'titulo', de modo que
+    # la consulta se resuelve solo con el índice
+    collection_libros.create_index([('autor_id', 1), ('anio', 1), ('titulo', 1)])
+    # Índice compuesto que sirve directamente el orden de 'consultar_libros'
+    collection_libros.create_index([('autor_nombre', 1), ('titulo', 1)])
+    # 3. Completar 'autor_nombre' en los libros que aún no lo tienen
+    collection_libros.aggregate(_PIPELINE_RELLENAR_AUTOR_NOMBRE)
 
 def insertar_autores(db: pymongo.database.Database, autores: List[Tuple[str]]) -> List[str]:
     """
     Inserta varios autores en la colección 'autores'
     """
     # Debes realizar los siguientes pasos:
-    dict_autores = []
+    # Los '_id' se generan en el cliente, así no hace falta leerlos del resultado
+    ids = [ObjectId() for _ in autores]
     # 1. Convertir las tuplas a documentos
-    for autor in autores:
-        dict_autor = {'nombre':autor[0]}
-        dict_autores.append(dict_autor)
-    # 2. Insertar los documentos
-    resultado = db.autores.insert_many(dict_autores)
+    dict_autores = [{'_id': autor_id, 'nombre': autor[0]}
+                    for autor_id, autor in zip(ids, autores)]
+    # 2. Insertar los documentos. Con 'ordered=False' el servidor no tiene que
+    # insertarlos uno tras otro ni detenerse en el primer error
+    db.autores.insert_many(dict_autores, ordered=False)
     # 3. Devolver los IDs como strings
-    id = [str(id) for id in resultado.inserted_ids]
-    return id
+    return [str(autor_id) for autor_id in ids]
 
 def insertar_libros(db: pymongo.database.Database, libros: List[Tuple[str, int, str]]) -> List[str]:
     """
-    Inserta varios libros en la colección 'libros'
+    Inserta varios libros en la colección 'libros'.
+    Cada libro guarda también el nombre de su autor ('autor_nombre') para que
+    las consultas no tengan que unir las colecciones en cada lectura.
     """
     # Debes realizar los siguientes pasos:
+    # Cada id de autor en texto se convierte a ObjectId una sola vez, aunque
+    # muchos libros compartan el mismo autor
+    cache_ids: Dict[str, ObjectId] = {}
+    autores_id = []
+    for libro in libros:
+        autor_id = libro[2]
+        if isinstance(autor_id, str):
+            if autor_id not in cache_ids:
+                cache_ids[autor_id] = ObjectId(autor_id)
+            autor_id = cache_ids[autor_id]
+        autores_id.append(autor_id)
+    # Obtenemos los nombres de todos los autores implicados con una sola consulta
+    nombres = {
+        autor['_id']: autor['nombre']
+        for autor in db.autores.find({'_id': {'$in': list(set(autores_id))}}, {'nombre': 1})
+    }
+    # Los '_id' de los libros se generan en el cliente
+    ids = [ObjectId() for _ in libros]
     # 1. Convertir las tuplas a documentos
-    dict_libros = [{'titulo':libro[0],
+    dict_libros = [{'_id': libro_id,
+                    'titulo':libro[0],
                     'anio':libro[1],
-                    'autor_id': ObjectId(libro[2]) if isinstance(libro[2], str) else libro[2]
+                    'autor_id': autor_id,
+                    'autor_nombre': nombres.get(autor_id)
                 }
-                for libro in libros
+                for libro_id, libro, autor_id in zip(ids, libros, autores_id)
                 ]
-    # 2. Insertar los documentos
-    resultado = db.libros.insert_many(dict_libros)
+    # 2. Insertar los documentos sin orden
+    db.libros.insert_many(dict_libros, ordered=False)
     # 3. Devolver los IDs como strings
-    id = [str(id) for id in resultado.inserted_ids]
-    return id
+    return [str(libro_id) for libro_id in ids]
+
+def iter_libros(
+        db: pymongo.database.Database,
+        tamano_lote: int = TAMANO_LOTE
+) -> Iterator[Tuple[str, int, str]]:
+    """
+    Recorre todos los libros ordenados por autor y título, devolviendo tuplas
+    (titulo, anio, autor_nombre) a medida que llegan del servidor.
+    'tamano_lote' limita los documentos que el cursor recibe en cada lote
+    """
+    # Como cada libro ya contiene 'autor_nombre', no hace falta unir con la
+    # colección 'autores': basta una consulta 'find' cuyo orden
+    # (autor_nombre, titulo) lo resuelve el índice compuesto. Los libros sin
+    # autor conocido se omiten.
+    resultados = db.libros.find(
+        _FILTRO_LIBROS, _PROYECCION_LIBROS
+    ).sort(_ORDEN_LIBROS).batch_size(tamano_lote)
+    for libro in resultados:
+        yield libro['titulo'], libro['anio'], libro['autor_nombre']
 
-def consultar_libros(db: pymongo.database.Database) -> None:
+def consultar_libros(db: pymongo.database.Database, tamano_lote: int = TAMANO_LOTE) -> None:
     """
     Consulta todos los libros y muestra título, año y nombre del autor
     """
     # Debes realizar los siguientes pasos:
-    # 1. Realizar una agregación para unir libros con autores
-    # pipeline de agregación que procesa documentos de la colección 'libros'
-    # y de la colección autores.
-    # Busca documentos en la colección autores donde el campo '_id' coincida con 
-    # el valor del campo 'autor_id' en los documentos de la colección libros.
-    # Los documentos coincidentes de autores se añaden a los documentos de
-    # libros en un nuevo campo de tipo array llamado autor.
-    pipeline = [
-        {
-        '$lookup': {
-            'from': 'autores',          # La colección a unir a libros
-            'localField': 'autor_id',   # Campo de 'libros'
-            'foreignField': '_id',      # Campo de 'autores'
-            'as': 'autor'               # Nombre del nuevo array que contendrá los documentos unidos
-            }
-        },
-    
-    # Para cada elemento en el array 'autor', se genera un nuevo documento de
-    # salida. Esto es útil para aplanar la estructura de datos y permitir
-    # un fácil acceso a los campos del autor en etapas posteriores.
-        {
-            '$unwind': '$autor'
-        },
-
-    # Aquí se reforman los documentos de salida, seleccionando campos
-    # específicos y creando uno nuevo.
-    # Incluye los campos titulo y anio (el valor 1 indica que se incluyen,
-    # (_id se excluye por defecto en $project a menos que se especifique lo contrario).
-    # También se crea un nuevo campo llamado 'autor_nombre' que toma el valor
-    # del campo 'nombre' dentro del documento del autor ($autor.nombre).
-        {
-            '$project': {
-                'titulo': 1,
-                'anio': 1,
-                'autor_nombre': '$autor.nombre'
-            }
-        },
-    # Esta etapa ordena los documentos resultantes, primero por el campo
-    # 'autor_nombre' en orden ascendente (1) y, si varios documentos tienen el
-    # mismo 'autor_nombre', se ordenan adicionalmente por el campo titulo
-    # en orden ascendente (1).
-        {
-            '$sort': {'autor_nombre': 1, 'titulo': 1}
-        }
+    # 1. Consultar los libros
+    # 2. Mostrar los resultados con una única escritura en lugar de un print por libro
+    lineas = [
+        f"Título: {titulo} - Año: {anio} - Autor: {autor}\n"
+        for titulo, anio, autor in iter_libros(db, tamano_lote)
     ]
-    # Ejecuta el pipeline y almacena los resultados
-    resultados = db.libros.aggregate(pipeline)
-    # 2. Mostrar los resultados
-    for libro in resultados:
-        print(f'Título: {libro['titulo']} - Año: {libro['anio']} - Autor: {libro['autor_nombre']}')
+    sys.stdout.write("".join(lineas))
 
-def buscar_libros_por_autor(db: pymongo.database.Database, nombre_autor: str) -> List[Tuple[str, int]]:
+def buscar_libros_por_autor(
+        db: pymongo.database.Database,
+        nombre_autor: str,
+        tamano_lote: int = TAMANO_LOTE
+) -> List[Tuple[str, int]]:
     """
-    Busca libros por el nombre del autor
+    Busca libros por el nombre del autor.
+    'tamano_lote' limita los documentos que el cursor recibe en cada lote
     """
     # Debes realizar los siguientes pasos:
-    # 1. Primero encontrar el autor y buscar todos los libros del autor
-    autor = db.autores.find_one({"nombre": nombre_autor})
-    if not autor:
-        return []
-    # pipeline de agregación que filtra los documentos de la colección 'libros'
-    # que sean del autor.
-    pipeline = [
-        {
-            '$match': {'autor_id': autor['_id']}
-        },
-    # Se ordenan los documentos resultantes, por el campo 'anio' en orden ascendente (1)
-        {
-            '$sort': {'anio': 1}
-        },
-    # Se reforman los documentos de salida, seleccionando campos específicos
-        {
-            '$project': {
-                'titulo': 1,
-                'anio': 1,
-                '_id': 0
-            }
-        }
-    ]
+    # 1. Encontrar el autor y buscar todos los libros del autor.
+    # Se hace en un único pipeline sobre 'autores' para ahorrar un viaje de ida
+    # y vuelta al servidor: el '$match' va primero para que el índice por
+    # 'nombre' filtre el autor antes de unirlo con sus libros.
+    # Solo la etapa '$match' depende del autor; el resto del pipeline es fijo
+    pipeline = [{'$match': {'nombre': nombre_autor}}, *_PIPELINE_LIBROS_AUTOR]
     # Se ejecuta el pipeline y se almacenan los resultados
-    resultados = db.libros.aggregate(pipeline)
+    resultados = db.autores.aggregate(pipeline, batchSize=tamano_lote)
     # 2. Convertir a lista de tuplas (titulo, anio)
     libros_autor = [(libro['titulo'], libro['anio']) for libro in resultados]
     return libros_autor
@@ -289,15 +423,56 @@ def actualizar_libro(
     if not actualizacion:
         return True
     # 2. Realizar la actualización
-    # Filtramos el documento por su _id
-    # El operador '$set' añade los campos si no existen
-    resultado = db.libros.update_one(
+    # Si se ha modificado algún documento, la actualización se ha realizado
+    return actualizar_libros(db, [(id_libro, actualizacion)]) > 0
+
+def actualizar_libros(
+        db: pymongo.database.Database,
+        actualizaciones: List[Tuple[str, Dict[str, Any]]]
+) -> int:
+    """
+    Actualiza varios libros con una sola petición al servidor.
+    Recibe una lista de tuplas (id_libro, campos) y devuelve cuántos libros
+    se han modificado
+    """
+    # Una operación 'UpdateOne' por libro: filtramos el documento por su _id
+    # y el operador '$set' añade los campos si no existen
+    operaciones = [
+        pymongo.UpdateOne({'_id': ObjectId(id_libro)}, {'$set': campos})
+        for id_libro, campos in actualizaciones
+        if campos
+    ]
+    if not operaciones:
+        return 0
+    # 'bulk_write' envía todas las operaciones juntas; sin orden, el servidor
+    # no se detiene en el primer error
+    resultado = db.libros.bulk_write(operaciones, ordered=False)
+    return resultado.modified_count
+
+def actualizar_y_obtener_libro(
+        db: pymongo.database.Database,
+        id_libro: str,
+        nuevo_titulo: Optional[str]=None,
+        nuevo_anio: Optional[int]=None
+) -> Optional[Dict[str, Any]]:
+    """
+    Actualiza un libro y devuelve el documento ya actualizado (o None si el
+    libro no existe) con una sola petición al servidor
+    """
+    actualizacion = {}
+    if nuevo_titulo is not None:
+        actualizacion['titulo'] = nuevo_titulo
+    if nuevo_anio is not None:
+        actualizacion['anio'] = nuevo_anio
+
+    if not actualizacion:
+        return db.libros.find_one({'_id': ObjectId(id_libro)})
+    # 'ReturnDocument.AFTER' hace que se devuelva el documento tras aplicar '$set'
+    return db.libros.find_one_and_update(
         {'_id': ObjectId(id_libro)},
-        {'$set': actualizacion}
+        {'$set': actualizacion},
+        return_document=pymongo.ReturnDocument.AFTER
     )
-    # Si el atributo 'modified.count'es mayor que 0, es que se ha realizado
-    # alguna operación de actualización
-    return resultado.modified_count > 0
 
 def eliminar_libro(
         db: pymongo.database.Database,
@@ -314,39 +489,35 @@ def eliminar_libro(
 
 def ejemplo_transaccion(db: pymongo.database.Database) -> bool:
     """
-    Demuestra el uso de operaciones agrupadas
+    Demuestra el uso de una transacción: el autor y sus libros se insertan
+    juntos o, si algo falla, no se inserta nada
     """
-    # Debes realizar los siguientes pasos:
-    # 1. Insertar un nuevo autor
     try:
-        autor = {"nombre": "J.R.R. Tolkien"}
-        # Insertamos el documento
-        resultado = db.autores.insert_one(autor)
-        autor_id = resultado.inserted_id
-    # 2. Insertar dos libros del autor
-        libros = [{
-                "titulo": "El hobbit",
-                "anio": 1937,
-                "autor_id": autor_id
-                },
-                {
-                "titulo": "El Señor de los Anillos",
-                "anio": 1954,
-                "autor_id": autor_id
-                }
-                ]
-        db.libros.insert_many(libros)
+        with db.client.start_session() as sesion:
+            # Al salir del bloque sin errores se confirma la transacción; si se
+            # produce una excepción, se aborta y se descartan todas las escrituras
+            with sesion.start_transaction():
+                # 1. Insertar un nuevo autor
+                autor = {"nombre": "J.R.R. Tolkien"}
+                autor_id = db.autores.insert_one(autor, session=sesion).inserted_id
+                # 2. Insertar dos libros del autor
+                libros = [{
+                        "titulo": "El hobbit",
+                        "anio": 1937,
+                        "autor_id": autor_id,
+                        "autor_nombre": autor["nombre"]
+                        },
+                        {
+                        "titulo": "El Señor de los Anillos",
+                        "anio": 1954,
+                        "autor_id": autor_id,
+                        "autor_nombre": autor["nombre"]
+                        }
+                        ]
+                db.libros.insert_many(libros, ordered=False, session=sesion)
         return True
-    # Intentar limpiar los datos en caso de error
     except Exception as e:
         print(f"Error en la transacción: {e}")
-        # Intentar limpiar los datos en caso de error
-        try:
-            if 'autor_id' in locals():
-                db.autores.delete_one({"_id": autor_id})
-                db.libros.delete_many({"autor_id": autor_id})
-        except:
-            pass
         return False
 
 
@@ -411,22 +582,19 @@ if __name__ == "__main__":
         for libro in libros_autor:
             print(f"- {libro[0]}, {libro[1]}")
 
-        # Primero obtenemos el ID del primer libro
-        primer_libro = db.libros.find_one({"titulo": "Cien años de soledad"})
-        if primer_libro is not None:
-            libro_id = str(primer_libro["_id"])
-        # Llamamos a la función 'actualizar_libro'
-        result = actualizar_libro(db, libro_id, nuevo_titulo='Titulo actualizado', nuevo_anio=2025)
-        if result:
+        # Primero obtenemos el ID del primer libro ("Cien años de soledad")
+        libro_id = libros_id[0]
+        # Actualizamos el libro y obtenemos el documento ya actualizado en una
+        # sola operación para verificar el cambio
+        libro_actualizado = actualizar_y_obtener_libro(
+            db, libro_id, nuevo_titulo='Titulo actualizado', nuevo_anio=2025
+        )
+        if libro_actualizado is not None:
             print('\nLibro actualizado correctamente:')
-            # Verificar que el libro se actualizó correctamente
-            libro_actualizado = db.libros.find_one({"_id": ObjectId(libro_id)})
-            print(f'Titulo: {libro_actualizado['titulo']}, Año: {libro_actualizado['anio']}')
-
-        # Ahora obtenemos el ID del último libro
-        ultimo_libro = db.libros.find_one({"titulo": "El Aleph"})
-        if ultimo_libro is not None:
-            libro_id = str(ultimo_libro["_id"])
+            print(f"Titulo: {libro_actualizado['titulo']}, Año: {libro_actualizado['anio']}")
+
+        # Ahora obtenemos el ID del último libro ("El Aleph")
+        libro_id = libros_id[-1]
         # Llamamos a la función 'eliminar_libro'
         result = eliminar_libro(db, libro_id)
         if result:
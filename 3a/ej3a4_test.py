@@ -9,8 +9,8 @@ from bson.objectid import ObjectId
 from ej3a4 import (
     verificar_docker_instalado, iniciar_mongodb_docker, detener_mongodb_docker,
     crear_conexion, crear_colecciones, insertar_autores, insertar_libros,
-    consultar_libros, buscar_libros_por_autor, actualizar_libro, eliminar_libro,
-    ejemplo_transaccion
+    iter_libros, consultar_libros, buscar_libros_por_autor, actualizar_libro,
+    actualizar_libros, actualizar_y_obtener_libro, eliminar_libro, ejemplo_transaccion
 )
 
 # Datos de prueba
@@ -41,9 +41,8 @@ def conexion():
         db = crear_conexion()
         crear_colecciones(db)
         yield db
-        # Limpiar las colecciones después de cada prueba
-        db.autores.drop()
-        db.libros.drop()
+        # Limpiar la base de datos después de cada prueba con una sola orden
+        db.client.drop_database(db.name)
     except Exception as e:
         pytest.skip(f"No se pudo conectar a MongoDB: {e}")
 
@@ -80,6 +79,10 @@ def test_crear_conexion(conexion):
     assert isinstance(conexion, pymongo.database.Database)
     assert conexion.name == "biblioteca"
 
+def test_crear_conexion_reutiliza_cliente(conexion):
+    """Prueba que las conexiones comparten el mismo MongoClient"""
+    assert crear_conexion().client is conexion.client
+
 def test_crear_colecciones(conexion):
     """Prueba la función crear_colecciones"""
     crear_colecciones(conexion)
@@ -130,6 +133,12 @@ def test_insertar_libros(conexion, datos_prueba):
     assert libros_en_db[1]["titulo"] == "El amor en los tiempos del cólera"
     assert libros_en_db[1]["anio"] == 1985
 
+def test_insertar_libros_autor_nombre(conexion, datos_prueba):
+    """Prueba que cada libro guarda el nombre de su autor"""
+    libro = conexion.libros.find_one({"titulo": "Paula"})
+    assert libro["autor_nombre"] == "Isabel Allende"
+    assert libro["autor_id"] == ObjectId(datos_prueba['autor_ids'][1])
+
 def test_consultar_libros(conexion, datos_prueba, capfd):
     """Prueba la función consultar_libros usando capfd para capturar la salida estándar"""
     consultar_libros(conexion)
@@ -145,6 +154,38 @@ def test_consultar_libros(conexion, datos_prueba, capfd):
     assert "Ficciones" in salida
     assert "Jorge Luis Borges" in salida
 
+def test_iter_libros(conexion, datos_prueba):
+    """Prueba la función iter_libros"""
+    libros = list(iter_libros(conexion, tamano_lote=2))
+
+    # Ordenados por nombre del autor y después por título
+    assert len(libros) == 6
+    assert libros[0] == ("Cien años de soledad", 1967, "Gabriel García Márquez")
+    assert libros[1] == ("El amor en los tiempos del cólera", 1985, "Gabriel García Márquez")
+    assert libros[-1] == ("Ficciones", 1944, "Jorge Luis Borges")
+
+def test_iter_libros_sin_autor_nombre(conexion, datos_prueba):
+    """Prueba los libros sin 'autor_nombre' y los de un autor inexistente"""
+    # Libro guardado sin 'autor_nombre' (como hacía la versión anterior)
+    conexion.libros.insert_one({
+        "titulo": "El Aleph (reedición)",
+        "anio": 1952,
+        "autor_id": ObjectId(datos_prueba['autor_ids'][2])
+    })
+    # Libro de un autor que no existe
+    insertar_libros(conexion, [("Huérfano", 2000, str(ObjectId()))])
+
+    # crear_colecciones completa el nombre del autor que falta
+    crear_colecciones(conexion)
+    libro = conexion.libros.find_one({"titulo": "El Aleph (reedición)"})
+    assert libro["autor_nombre"] == "Jorge Luis Borges"
+
+    # El libro sin autor conocido no aparece, igual que con la unión de colecciones
+    libros = list(iter_libros(conexion))
+    assert len(libros) == 7
+    assert ("El Aleph (reedición)", 1952, "Jorge Luis Borges") in libros
+    assert all(libro[0] != "Huérfano" for libro in libros)
+
 def test_buscar_libros_por_autor(conexion, datos_prueba):
     """Prueba la función buscar_libros_por_autor"""
     # Buscar libros de Gabriel García Márquez
@@ -197,6 +238,27 @@ def test_actualizar_libro(conexion, datos_prueba):
     assert libro_actualizado["titulo"] == "Título actualizado"
     assert libro_actualizado["anio"] == 2021
 
+def test_actualizar_libros(conexion, datos_prueba):
+    """Prueba la función actualizar_libros"""
+    libro_ids = datos_prueba['libro_ids']
+    modificados = actualizar_libros(conexion, [
+        (libro_ids[0], {"anio": 2000}),
+        (libro_ids[1], {"titulo": "Otro título"}),
+        (libro_ids[2], {})
+    ])
+    assert modificados == 2
+    assert conexion.libros.find_one({"_id": ObjectId(libro_ids[0])})["anio"] == 2000
+    assert conexion.libros.find_one({"_id": ObjectId(libro_ids[1])})["titulo"] == "Otro título"
+
+def test_actualizar_y_obtener_libro(conexion, datos_prueba):
+    """Prueba la función actualizar_y_obtener_libro"""
+    libro_id = datos_prueba['libro_ids'][0]
+    libro = actualizar_y_obtener_libro(conexion, libro_id, nuevo_anio=2025)
+
+    # Devuelve el documento ya actualizado
+    assert libro["titulo"] == "Cien años de soledad"
+    assert libro["anio"] == 2025
+
 def test_eliminar_libro(conexion, datos_prueba):
     """Prueba la función eliminar_libro"""
     # Primero obtenemos el ID del último libro
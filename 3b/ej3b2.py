@@ -14,15 +14,105 @@ Libros:
 2. `POST /books`: Agrega un nuevo libro. El cuerpo de la solicitud debe incluir JSON con campos "title", "author_id", y "year" (opcional).
 3. `DELETE /books/<book_id>`: Elimina un libro específico por su ID.
 4. `PUT /books/<book_id>`: Actualiza la información de un libro existente. El cuerpo puede incluir "title" y/o "year".
+5. `POST /books/bulk`: Agrega varios libros a la vez. El cuerpo es una lista JSON de libros como los de `POST /books`.
 
 Esta versión utiliza Flask-SQLAlchemy como ORM para persistir los datos en una base de datos SQLite.
 """
 
-from flask import Flask, jsonify, request
+import gzip
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import msgpack
+import orjson
+from flask import Flask, Response, abort, g, request
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+
+# zstandard es opcional: si está instalado se ofrece compresión zstd además de gzip
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 db = SQLAlchemy()
 
+# Número máximo de respuestas GET que guarda la caché de cada aplicación
+CACHE_MAX_ENTRIES = 256
+# Las respuestas más pequeñas se envían sin comprimir
+COMPRESS_MIN_SIZE = 512
+# Formatos de respuesta que admiten los listados, el primero es el de por defecto.
+# MessagePack (Accept: application/msgpack) es más compacto que JSON
+LIST_MIMETYPES = ['application/json', 'application/msgpack']
+
+
+def compress(body, encoding):
+    """
+    Comprime el cuerpo de una respuesta con la codificación indicada
+    """
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    return gzip.compress(body, compresslevel=6)
+
+
+def ojsonify(obj, status=200):
+    """
+    Equivalente a jsonify que serializa con orjson: genera los bytes
+    directamente y es bastante más rápido que el módulo json estándar
+    """
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+
+
+def load_json():
+    """
+    Lee el cuerpo JSON de la solicitud con orjson (más rápido que get_json).
+    Un cuerpo vacío o que no es JSON válido termina en un error 400
+    """
+    body = request.get_data(cache=False)
+    if not body:
+        abort(400)
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        abort(400)
+
+
+def book_error(data):
+    """
+    Comprueba en Python los campos de un libro antes de insertarlo y devuelve
+    el mensaje de error, o None si es válido. Así el único IntegrityError que
+    puede dar la inserción es el de la clave foránea (autor inexistente)
+    """
+    if not isinstance(data, dict):
+        return "El libro debe ser un objeto JSON"
+    title = data.get('title')
+    if not isinstance(title, str) or not title:
+        return "'title' debe ser un texto no vacío"
+    author_id = data.get('author_id')
+    # bool es una subclase de int, pero no es un id válido
+    if not isinstance(author_id, int) or isinstance(author_id, bool):
+        return "'author_id' debe ser un número entero"
+    return None
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """
+    Configura cada conexión SQLite nueva:
+    - SQLite no comprueba las claves foráneas salvo que se active en cada conexión
+    - WAL y synchronous=NORMAL permiten lectores concurrentes y escrituras más
+      rápidas si la base de datos es un fichero (en memoria no tienen efecto)
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
 # Define aquí tus modelos
 # Usa los mismos modelos que en el ejercicio anterior: Author y Book
 
@@ -34,17 +124,22 @@ class Author(db.Model):
     # Define la tabla 'authors' con:
     # - __tablename__ para especificar el nombre de la tabla
     # - id: clave primaria autoincremental
-    # - name: nombre del autor (obligatorio)
+    # - name: nombre del autor (obligatorio, hasta 255 caracteres)
     # - Una relación con los libros usando db.relationship
     __tablename__ = 'authors'
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String, nullable=False)
-    books = db.relationship("Book", back_populates="author")
+    name = db.Column(db.String(255), nullable=False)
+    # lazy='select' (carga al acceder, una vez) y no 'dynamic', que lanzaría una
+    # consulta nueva cada vez que se recorre la relación. Si hace falta la lista
+    # completa para muchos autores, se carga en la propia consulta (selectinload)
+    books = db.relationship("Book", back_populates="author", lazy='select')
 
     def to_dict(self):
         """Convierte el autor a un diccionario para la respuesta JSON"""
         # Implementa este método para devolver id y name
         # No incluyas la lista de libros para evitar recursión infinita
+        # Solo se usa para respuestas de un único objeto: los listados
+        # seleccionan las columnas directamente sin crear objetos Author
         return {
             'id': self.id,
             'name': self.name   
@@ -59,19 +154,21 @@ class Book(db.Model):
     # Define la tabla 'books' con:
     # - __tablename__ para especificar el nombre de la tabla
     # - id: clave primaria autoincremental
-    # - title: título del libro (obligatorio)
+    # - title: título del libro (obligatorio, hasta 512 caracteres)
     # - year: año de publicación (opcional)
-    # - author_id: clave foránea que relaciona con la tabla 'authors'
+    # - author_id: clave foránea que relaciona con la tabla 'authors' (con índice,
+    #   para obtener los libros de un autor sin recorrer toda la tabla)
     __tablename__ = "books"
     id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String, nullable=False)
+    title = db.Column(db.String(512), nullable=False)
     year = db.Column(db.Integer, nullable=True)
-    author_id = db.Column(db.Integer, db.ForeignKey('authors.id'), nullable=False)
-    author = db.relationship("Author", back_populates="books")
+    author_id = db.Column(db.Integer, db.ForeignKey('authors.id'), nullable=False, index=True)
+    author = db.relationship("Author", back_populates="books", lazy='select')
 
     def to_dict(self):
         """Convierte el libro a un diccionario para la respuesta JSON"""
         # Implementa este método para devolver id, title, year y author_id
+        # El literal es más rápido que dict(zip(claves, valores))
         return {
             'id': self.id,
             'title': self.title,
@@ -89,14 +186,138 @@ def create_app():
     # Configuración de la base de datos SQLite en memoria
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Sin registro ni eco de las consultas: ambos añaden trabajo a cada sentencia
+    app.config['SQLALCHEMY_RECORD_QUERIES'] = False
+    app.config['SQLALCHEMY_ECHO'] = False
+    # Si alguna respuesta usa el JSON de Flask, que no ordene las claves
+    app.json.sort_keys = False
+    # Una base de datos en memoria solo existe dentro de su conexión: StaticPool
+    # comparte esa única conexión entre todos los hilos, en lugar de que cada
+    # hilo abra una conexión nueva (y vea una base de datos vacía)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'poolclass': StaticPool,
+        'connect_args': {'check_same_thread': False}
+    }
     
     # Inicializa la base de datos con la aplicación
     db.init_app(app)
     
     # Crea todas las tablas en la base de datos
     with app.app_context():
+        # El listener se registra antes de abrir la primera conexión
+        event.listen(db.engine, 'connect', _configure_sqlite)
         db.create_all()
-    
+
+    # Caché de las respuestas GET de esta aplicación:
+    # ruta -> (versión, etag, cuerpo JSON, {(formato, codificación): cuerpo}).
+    # Cada endpoint que modifica datos incrementa la versión de su tabla, así que
+    # una entrada solo se reutiliza mientras las tablas no hayan cambiado.
+    # Como hay una entrada por cada /authors/<id>, la caché descarta la menos
+    # usada recientemente al superar CACHE_MAX_ENTRIES
+    cache = OrderedDict()
+    cache_lock = threading.Lock()
+    # Todas las sesiones comparten la única conexión SQLite (StaticPool), y con
+    # ella la transacción abierta: las peticiones se atienden de una en una para
+    # que ninguna lea (ni guarde en la caché) cambios de otra sin confirmar
+    db_lock = threading.Lock()
+    versions = {'authors': 0, 'books': 0}
+    encodings = ['zstd', 'gzip'] if zstandard is not None else ['gzip']
+
+    # Cada petición usa una sola transacción: los endpoints solo añaden cambios
+    # a la sesión (flush si necesitan ids o comprobar restricciones) y marcan
+    # las tablas que modifican. Al terminar, se confirma una vez si la respuesta
+    # es correcta; si no, la sesión se descarta y no se guarda nada
+    def mark_changed(table):
+        """Marca una tabla como modificada en la petición actual"""
+        g.setdefault('changed_tables', set()).add(table)
+
+    @app.before_request
+    def lock_db():
+        """Reserva la conexión a la base de datos para la petición actual"""
+        db_lock.acquire()
+        g.db_locked = True
+
+    @app.teardown_request
+    def unlock_db(exc):
+        """
+        Descarta lo que no se haya confirmado (respuesta con error o excepción)
+        antes de liberar la conexión para la siguiente petición
+        """
+        if g.pop('db_locked', False):
+            try:
+                db.session.remove()
+            finally:
+                db_lock.release()
+
+    @app.after_request
+    def commit_request(response):
+        """
+        Confirma la transacción de la petición si ha modificado datos y ha
+        terminado bien, e invalida la caché de las tablas modificadas
+        """
+        changed = g.pop('changed_tables', None)
+        if changed and response.status_code < 400:
+            db.session.commit()
+            # Las versiones se incrementan después de confirmar
+            for table in changed:
+                versions[table] += 1
+        return response
+
+    def cached_json(build, allow_msgpack=False):
+        """
+        Devuelve la respuesta JSON de la ruta actual desde la caché, generándola
+        con build() si no existe o si los datos han cambiado. Incluye un ETag:
+        si el cliente ya tiene esa versión (If-None-Match) se responde 304.
+        Si el cliente lo acepta, el cuerpo se comprime una sola vez por versión
+        y codificación, y la versión comprimida también se guarda en la caché.
+        Con allow_msgpack, el cliente puede pedir la respuesta en MessagePack
+        """
+        # Con db_lock ninguna otra petición modifica los datos mientras tanto,
+        # así que la versión leída corresponde a lo que devuelve build()
+        version = (versions['authors'], versions['books'])
+        with cache_lock:
+            entry = cache.get(request.path)
+            if entry is not None:
+                cache.move_to_end(request.path)
+        if entry is None or entry[0] != version:
+            # El cuerpo se genera fuera de cache_lock, que solo protege el
+            # diccionario de la caché
+            body = orjson.dumps(build())
+            etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+            entry = (version, etag, body, {})
+            with cache_lock:
+                cache[request.path] = entry
+                cache.move_to_end(request.path)
+                if len(cache) > CACHE_MAX_ENTRIES:
+                    cache.popitem(last=False)
+        _, etag, body, variants = entry
+        mimetype = LIST_MIMETYPES[0]
+        if allow_msgpack:
+            mimetype = request.accept_mimetypes.best_match(LIST_MIMETYPES, LIST_MIMETYPES[0])
+        encoding = None
+        if len(body) >= COMPRESS_MIN_SIZE:
+            encoding = request.accept_encodings.best_match(encodings)
+        if mimetype != LIST_MIMETYPES[0] or encoding is not None:
+            key = (mimetype, encoding)
+            if key not in variants:
+                data = body
+                if mimetype == 'application/msgpack':
+                    data = msgpack.packb(orjson.loads(body))
+                if encoding is not None:
+                    data = compress(data, encoding)
+                variants[key] = data
+            body = variants[key]
+            # Cada representación tiene su propio ETag
+            etag = '-'.join([etag, mimetype.split('/')[1], encoding or 'identity'])
+        response = Response(body, mimetype=mimetype)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        if allow_msgpack:
+            response.vary.add('Accept')
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
     # Endpoints de Autores
     @app.route('/authors', methods=['GET'])
     def get_authors():
@@ -105,10 +326,14 @@ def create_app():
         """
         # Implementa este endpoint:
         # - Consulta todos los autores
-        # - Convierte cada autor a diccionario usando to_dict()           
+        # - Convierte cada autor a diccionario
         # - Devuelve la lista en formato JSON
-        authors = Author.query.all()
-        return jsonify([author.to_dict() for author in authors])
+        def build():
+            # Se seleccionan solo las columnas: cada fila llega como un mapping sin
+            # construir objetos Author (ni registrarlos en la sesión)
+            rows = db.session.execute(select(Author.id, Author.name)).mappings()
+            return [dict(row) for row in rows]
+        return cached_json(build, allow_msgpack=True)
 
     @app.route('/authors', methods=['POST'])
     def add_author():
@@ -121,11 +346,14 @@ def create_app():
         # - Crea un nuevo autor con el nombre proporcionado
         # - Lo guarda en la base de datos
         # - Devuelve el autor creado con código 201
-        data = request.get_json()
+        data = load_json()
         author = Author(name=data['name'])
         db.session.add(author)
-        db.session.commit()
-        return jsonify(author.to_dict()), 201
+        # flush inserta el autor (y obtiene su id) dentro de la transacción de
+        # la petición, que se confirma en commit_request
+        db.session.flush()
+        mark_changed('authors')
+        return ojsonify(author.to_dict(), status=201)
 
     @app.route('/authors/<int:author_id>', methods=['GET'])
     def get_author(author_id):
@@ -133,12 +361,23 @@ def create_app():
         Obtiene los detalles de un autor específico y su lista de libros
         """
         # Implementa este endpoint:
-        # - Busca el autor por ID (usa get_or_404 para gestionar el error 404)
+        # - Busca el autor por ID (si no existe, error 404)
         # - Devuelve los detalles del autor y su lista de libros
-        author = Author.query.get_or_404(author_id)
-        author_data = author.to_dict()
-        author_data['books'] = [book.to_dict() for book in author.books]
-        return jsonify(author_data)
+        def build():
+            # Igual que en los listados, se seleccionan columnas en lugar de
+            # objetos: el autor y sus libros llegan como mappings que se
+            # serializan directamente, sin crear objetos Author ni Book
+            author = db.session.execute(
+                select(Author.id, Author.name).where(Author.id == author_id)
+            ).mappings().first()
+            if author is None:
+                abort(404)
+            books = db.session.execute(
+                select(Book.id, Book.title, Book.year, Book.author_id)
+                .where(Book.author_id == author_id)
+            ).mappings()
+            return {**author, 'books': [dict(book) for book in books]}
+        return cached_json(build)
 
     # Endpoints de Libros
     @app.route('/books', methods=['GET'])
@@ -150,8 +389,12 @@ def create_app():
         # - Consulta todos los libros
         # - Convierte cada libro a diccionario
         # - Devuelve la lista en formato JSON
-        books = Book.query.all()
-        return jsonify([book.to_dict() for book in books])
+        def build():
+            rows = db.session.execute(
+                select(Book.id, Book.title, Book.year, Book.author_id)
+            ).mappings()
+            return [dict(row) for row in rows]
+        return cached_json(build, allow_msgpack=True)
 
     @app.route('/books', methods=['POST'])
     def add_book():
@@ -164,16 +407,60 @@ def create_app():
         # - Crea un nuevo libro con título, autor_id y año (opcional)
         # - Lo guarda en la base de datos
         # - Devuelve el libro creado con código 201
-        data = request.get_json()
-        author = Author.query.get_or_404(data['author_id'])  # Verify author exists
+        data = load_json()
+        error = book_error(data)
+        if error is not None:
+            return ojsonify({"error": error}, status=400)
         book = Book(
             title=data['title'],
             author_id=data['author_id'],
             year=data.get('year')  # Optional field
         )
         db.session.add(book)
-        db.session.commit()
-        return jsonify(book.to_dict()), 201
+        # No se consulta antes si el autor existe: lo comprueba la clave foránea
+        # al insertar, con una sola sentencia. Los demás campos ya se han
+        # comprobado, así que un IntegrityError solo puede deberse al autor
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return ojsonify({"error": "No existe un autor con el id proporcionado"}, status=400)
+        mark_changed('books')
+        return ojsonify(book.to_dict(), status=201)
+
+    @app.route('/books/bulk', methods=['POST'])
+    def add_books_bulk():
+        """
+        Agrega varios libros en una sola transacción
+        El cuerpo de la solicitud debe ser una lista JSON de libros con "title",
+        "author_id" y "year" (opcional)
+        """
+        data = load_json()
+        if not isinstance(data, list):
+            return ojsonify({"error": "Se esperaba una lista de libros"}, status=400)
+        rows = []
+        for item in data:
+            error = book_error(item)
+            if error is not None:
+                return ojsonify({"error": error}, status=400)
+            rows.append({
+                'title': item['title'],
+                'author_id': item['author_id'],
+                'year': item.get('year')
+            })
+        if not rows:
+            return ojsonify({"count": 0, "ids": []}, status=201)
+        # Un único INSERT reutilizado para todas las filas, sin crear objetos Book.
+        # RETURNING devuelve los ids generados en el mismo orden que las filas.
+        # Como en add_book, un IntegrityError solo puede deberse a un autor inexistente
+        stmt = insert(Book).returning(Book.id, sort_by_parameter_order=True)
+        try:
+            ids = db.session.execute(stmt, rows).scalars().all()
+        except IntegrityError:
+            db.session.rollback()
+            return ojsonify({"error": "No existe un autor con el id proporcionado"}, status=400)
+        mark_changed('books')
+        return ojsonify({"count": len(ids), "ids": ids}, status=201)
 
     @app.route('/books/<int:book_id>', methods=['GET'])
     def get_book(book_id):
@@ -181,11 +468,13 @@ def create_app():
         Obtiene un libro específico por su ID
         """
         # Implementa este endpoint:
-        # - Busca el libro por ID (usa get_or_404 para gestionar el error 404)
+        # - Busca el libro por ID (si no existe, error 404)
         # - Devuelve los detalles del libro
-        book = Book.query.get_or_404(book_id)
+        # Session.get busca primero en la sesión y si no, por clave primaria,
+        # sin construir un objeto Query
+        book = db.session.get(Book, book_id) or abort(404)
         book_data = book.to_dict()
-        return jsonify(book_data)
+        return ojsonify(book_data)
 
     @app.route('/books/<int:book_id>', methods=['DELETE'])
     def delete_book(book_id):
@@ -193,12 +482,12 @@ def create_app():
         Elimina un libro específico por su ID
         """
         # Implementa este endpoint:
-        # - Busca el libro por ID (usa get_or_404)
+        # - Busca el libro por ID (si no existe, error 404)
         # - Elimina el libro de la base de datos
         # - Devuelve respuesta vacía con código 204
-        book = Book.query.get_or_404(book_id)
+        book = db.session.get(Book, book_id) or abort(404)
         db.session.delete(book)
-        db.session.commit()
+        mark_changed('books')
         return '', 204
 
     @app.route('/books/<int:book_id>', methods=['PUT'])
@@ -209,21 +498,44 @@ def create_app():
         """
         # Implementa este endpoint:
         # - Obtiene los datos JSON de la solicitud
-        # - Busca el libro por ID (usa get_or_404)
+        # - Busca el libro por ID (si no existe, error 404)
         # - Actualiza los campos proporcionados (título y/o año)
-        # - Guarda los cambios en la base de datos
+        # - Guarda los cambios en la base de datos (solo si alguno cambia,
+        #   al terminar la petición)
         # - Devuelve el libro actualizado
-        book = Book.query.get_or_404(book_id)
-        data = request.get_json()
-        if 'title' in data:
+        book = db.session.get(Book, book_id) or abort(404)
+        data = load_json()
+        dirty = False
+        if 'title' in data and book.title != data['title']:
             book.title = data['title']
-        if 'year' in data:
+            dirty = True
+        if 'year' in data and book.year != data['year']:
             book.year = data['year']
-        db.session.commit()
-        return jsonify(book.to_dict())
+            dirty = True
+        if dirty:
+            mark_changed('books')
+        return ojsonify(book.to_dict())
 
     return app
 
 if __name__ == '__main__':
-    app = create_app()
-    app.run(debug=True)
+    # El servidor de desarrollo de Werkzeug solo se usa con FLASK_DEBUG (o si
+    # gunicorn, que es opcional y no funciona en Windows, no está instalado).
+    # Si no, la aplicación se sirve con gunicorn y keep-alive para reutilizar
+    # las conexiones HTTP. Un solo proceso, porque la base de datos está en
+    # memoria y cada proceso tendría la suya. Las peticiones usan la única
+    # conexión SQLite de una en una (db_lock en create_app): los hilos no
+    # consultan en paralelo, solo solapan la lectura y el envío por la red
+    if os.getenv('FLASK_DEBUG') or shutil.which('gunicorn') is None:
+        app = create_app()
+        app.run(debug=bool(os.getenv('FLASK_DEBUG')))
+    else:
+        os.execvp('gunicorn', [
+            'gunicorn',
+            '--chdir', os.path.dirname(os.path.abspath(__file__)),
+            '--workers', '1',
+            '--worker-class', 'gthread',
+            '--threads', '4',
+            '--keep-alive', '5',
+            'ej3b2:create_app()'
+        ])
@@ -1,5 +1,11 @@
+import gzip
+import json
+import threading
+import time
+
+import msgpack
 import pytest
-from flask import Flask
+from flask import Flask, abort
 from flask.testing import FlaskClient
 from ej3b2 import create_app, db, Author, Book
 
@@ -65,6 +71,19 @@ def test_get_author_with_books(client):
     assert "Cien años de soledad" in book_titles
     assert "El amor en los tiempos del cólera" in book_titles
 
+def test_get_authors_etag(client):
+    """Test GET /authors returns 304 for a known ETag and changes it after a POST"""
+    response = client.get("/authors")
+    etag = response.headers["ETag"]
+
+    response = client.get("/authors", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.post("/authors", json={"name": "Ernest Hemingway"})
+    response = client.get("/authors", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json) == 3
+
 def test_get_nonexistent_author(client):
     """Test GET /authors/<id> for a non-existent author"""
     response = client.get("/authors/999")
@@ -83,6 +102,13 @@ def test_get_books(client):
     assert "Cien años de soledad" in titles
     assert "La casa de los espíritus" in titles
 
+def test_get_books_msgpack(client):
+    """Test GET /books in MessagePack when the client asks for it"""
+    response = client.get("/books", headers={"Accept": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.mimetype == "application/msgpack"
+    assert len(msgpack.unpackb(response.data)) == 3
+
 def test_get_book_by_id(client):
     """Test GET /books/<id> to retrieve a specific book"""
     response = client.get("/books/1")
@@ -123,6 +149,91 @@ def test_add_book_with_nonexistent_author(client):
     # This should either fail with a 404 or a 400 depending on implementation
     assert response.status_code in [400, 404]
 
+def test_add_book_invalid_fields(client):
+    """Test POST /books rejects a missing title or a non-integer author_id"""
+    response = client.post("/books", json={"title": None, "author_id": 1})
+    assert response.status_code == 400
+    assert "title" in response.json["error"]
+
+    response = client.post("/books", json={"title": "Test Book", "author_id": "1"})
+    assert response.status_code == 400
+    assert "author_id" in response.json["error"]
+
+    assert len(client.get("/books").json) == 3
+
+def test_add_books_bulk(client):
+    """Test POST /books/bulk to add several books at once"""
+    response = client.post("/books/bulk", json=[
+        {"title": "Crónica de una muerte anunciada", "author_id": 1, "year": 1981},
+        {"title": "Paula", "author_id": 2}
+    ])
+    assert response.status_code == 201
+    assert response.json["count"] == 2
+
+    # Verify books were added with the returned ids
+    book = client.get(f"/books/{response.json['ids'][1]}").json
+    assert book["title"] == "Paula"
+    assert book["year"] is None
+    assert len(client.get("/books").json) == 5
+
+    # A non-existent author rejects the whole batch
+    response = client.post("/books/bulk", json=[
+        {"title": "Test Book", "author_id": 1},
+        {"title": "Test Book 2", "author_id": 999}
+    ])
+    assert response.status_code == 400
+    assert len(client.get("/books").json) == 5
+
+    # A null title or a non-integer author_id is reported as such
+    response = client.post("/books/bulk", json=[{"title": None, "author_id": 1}])
+    assert response.status_code == 400
+    assert "title" in response.json["error"]
+    response = client.post("/books/bulk", json=[{"title": "Test Book", "author_id": [1]}])
+    assert response.status_code == 400
+    assert "author_id" in response.json["error"]
+    assert len(client.get("/books").json) == 5
+
+def test_failed_write_leaves_db_and_cache_unchanged(client):
+    """Test a write that fails after flushing is never seen by other requests"""
+    app = client.application
+    flushed = threading.Event()
+
+    @app.route("/books/failing", methods=["POST"])
+    def add_book_and_fail():
+        db.session.add(Book(title="Phantom", author_id=1))
+        db.session.flush()
+        flushed.set()
+        time.sleep(0.2)
+        abort(500)
+
+    writer = threading.Thread(target=lambda: app.test_client().post("/books/failing"))
+    writer.start()
+    assert flushed.wait(5)
+    # Sent while the failing request is still open
+    during = client.get("/books")
+    writer.join()
+    after = client.get("/books")
+
+    assert "Phantom" not in during.get_data(as_text=True)
+    assert after.data == during.data
+    assert after.headers["ETag"] == during.headers["ETag"]
+    assert db.session.query(Book).filter_by(title="Phantom").count() == 0
+
+def test_get_books_gzip(client):
+    """Test GET /books compresses large responses when the client accepts gzip"""
+    client.post("/books/bulk", json=[
+        {"title": f"Libro {i}", "author_id": 1, "year": 2000 + i} for i in range(20)
+    ])
+    response = client.get("/books", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(response.data))) == 23
+
+    # Without Accept-Encoding the response is plain JSON
+    response = client.get("/books")
+    assert "Content-Encoding" not in response.headers
+    assert len(response.json) == 23
+
 def test_update_book(client):
     """Test PUT /books/<id> to update a book"""
     # Update book 1